@@ -28,22 +28,50 @@ Features:
       multiprocessing.shared_memory can read/write the same block.
 """
 
-import os, re, shutil, subprocess
+import collections, functools, hashlib, io, os, pathlib, re, shutil, subprocess, threading
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import filedialog, scrolledtext, messagebox
 
 
 # --- ilasm finder -------------------------------------------------------------
 
+_ICON_RES_CACHE = collections.OrderedDict()   # (ico_path, mtime) -> .res bytes
+_RES_WRITTEN    = collections.OrderedDict()   # res_path -> ((ico_path, mtime), res mtime_ns) of our last write
+_ICON_RES_MAX   = 32                          # entries kept in each
+_ICON_RES_LOCK  = threading.Lock()
+
 def _write_icon_res(ico_path, res_path):
     """
     Write a Win32 .res file containing the icon from ico_path.
     Pure Python — no rc.exe or SDK needed.
+    The .res bytes are cached per icon path and mtime, and the file is
+    left alone if we already wrote it from this same icon.
     """
+    key = (os.path.abspath(ico_path), os.path.getmtime(ico_path))
+    try: res_mtime = os.stat(res_path).st_mtime_ns
+    except OSError: res_mtime = None
+    with _ICON_RES_LOCK:
+        written = _RES_WRITTEN.get(res_path)
+        data    = _ICON_RES_CACHE.get(key)
+    if res_mtime is not None and written == (key, res_mtime):
+        return
+    if data is None:
+        data = _icon_res_bytes(ico_path)
+    with open(res_path, 'wb') as f:
+        f.write(data)
+    written = (key, os.stat(res_path).st_mtime_ns)
+    with _ICON_RES_LOCK:
+        for cache, k, v in ((_ICON_RES_CACHE, key, data), (_RES_WRITTEN, res_path, written)):
+            cache[k] = v
+            cache.move_to_end(k)
+            if len(cache) > _ICON_RES_MAX: cache.popitem(last=False)
+
+
+def _icon_res_bytes(ico_path):
     import struct
 
-    with open(ico_path, 'rb') as f:
-        ico_data = f.read()
+    ico_data = pathlib.Path(ico_path).read_bytes()
 
     reserved, ico_type, count = struct.unpack_from('<HHH', ico_data, 0)
     if ico_type != 1:
@@ -58,55 +86,59 @@ def _write_icon_res(ico_path, res_path):
     def align4(n):
         return (4 - (n % 4)) % 4
 
-    with open(res_path, 'wb') as out:
-
-        # ── Mandatory null entry (must NOT be all-zeros — header fields required) ──
-        out.write(struct.pack('<I', 0))           # DataSize = 0
-        out.write(struct.pack('<I', 32))          # HeaderSize = 32
-        out.write(struct.pack('<HH', 0xFFFF, 0))  # Type = 0
-        out.write(struct.pack('<HH', 0xFFFF, 0))  # Name = 0
-        out.write(struct.pack('<I', 0))           # DataVersion
-        out.write(struct.pack('<H', 0))           # MemFlags
-        out.write(struct.pack('<H', 0))           # Language
-        out.write(struct.pack('<I', 0))           # Version
-        out.write(struct.pack('<I', 0))           # Characteristics
-
-        def write_res_entry(type_id, name_id, data, language=0x0409):
-            type_bytes = struct.pack('<HH', 0xFFFF, type_id)
-            name_bytes = struct.pack('<HH', 0xFFFF, name_id)
-            hdr_fixed  = 4 + 4 + len(type_bytes) + len(name_bytes) + 4 + 2 + 2 + 4 + 4
-            hdr_pad    = align4(hdr_fixed)
-            hdr_size   = hdr_fixed + hdr_pad
-            data_pad   = align4(len(data))
-
-            out.write(struct.pack('<I', len(data)))
-            out.write(struct.pack('<I', hdr_size))
-            out.write(type_bytes)
-            out.write(name_bytes)
-            out.write(struct.pack('<I', 0))        # DataVersion
-            out.write(struct.pack('<H', 0x1030))   # MemFlags: MOVEABLE|PURE|PRELOAD
-            out.write(struct.pack('<H', language))
-            out.write(struct.pack('<I', 0))        # Version
-            out.write(struct.pack('<I', 0))        # Characteristics
-            out.write(b'\x00' * hdr_pad)
-            out.write(data)
-            out.write(b'\x00' * data_pad)
-
-        # RT_ICON = 3: one entry per image in the .ico
-        for i, (w, h, cc, res2, planes, bc, size, img_off) in enumerate(entries):
-            img_data = ico_data[img_off: img_off + size]
-            write_res_entry(3, i + 1, img_data)
-
-        # RT_GROUP_ICON = 14: the directory that ties the RT_ICONs together
-        # GRPICONDIR header
-        grp = struct.pack('<HHH', 0, 1, count)
-        # GRPICONDIRENTRY: w(1) h(1) colorCount(1) reserved(1) planes(2) bitCount(2) bytesInRes(4) id(2)
-        for i, (w, h, cc, res2, planes, bc, size, img_off) in enumerate(entries):
-            grp += struct.pack('<BBBBHHIH', w, h, cc, res2, planes, bc, size, i + 1)
-        write_res_entry(14, 1, grp)
-
-
+    out = io.BytesIO()
+
+    # ── Mandatory null entry (must NOT be all-zeros — header fields required) ──
+    out.write(struct.pack('<I', 0))           # DataSize = 0
+    out.write(struct.pack('<I', 32))          # HeaderSize = 32
+    out.write(struct.pack('<HH', 0xFFFF, 0))  # Type = 0
+    out.write(struct.pack('<HH', 0xFFFF, 0))  # Name = 0
+    out.write(struct.pack('<I', 0))           # DataVersion
+    out.write(struct.pack('<H', 0))           # MemFlags
+    out.write(struct.pack('<H', 0))           # Language
+    out.write(struct.pack('<I', 0))           # Version
+    out.write(struct.pack('<I', 0))           # Characteristics
+
+    def write_res_entry(type_id, name_id, data, language=0x0409):
+        type_bytes = struct.pack('<HH', 0xFFFF, type_id)
+        name_bytes = struct.pack('<HH', 0xFFFF, name_id)
+        hdr_fixed  = 4 + 4 + len(type_bytes) + len(name_bytes) + 4 + 2 + 2 + 4 + 4
+        hdr_pad    = align4(hdr_fixed)
+        hdr_size   = hdr_fixed + hdr_pad
+        data_pad   = align4(len(data))
+
+        out.write(struct.pack('<I', len(data)))
+        out.write(struct.pack('<I', hdr_size))
+        out.write(type_bytes)
+        out.write(name_bytes)
+        out.write(struct.pack('<I', 0))        # DataVersion
+        out.write(struct.pack('<H', 0x1030))   # MemFlags: MOVEABLE|PURE|PRELOAD
+        out.write(struct.pack('<H', language))
+        out.write(struct.pack('<I', 0))        # Version
+        out.write(struct.pack('<I', 0))        # Characteristics
+        out.write(b'\x00' * hdr_pad)
+        out.write(data)
+        out.write(b'\x00' * data_pad)
+
+    # RT_ICON = 3: one entry per image in the .ico
+    for i, (w, h, cc, res2, planes, bc, size, img_off) in enumerate(entries):
+        img_data = ico_data[img_off: img_off + size]
+        write_res_entry(3, i + 1, img_data)
+
+    # RT_GROUP_ICON = 14: the directory that ties the RT_ICONs together
+    # GRPICONDIR header
+    grp = struct.pack('<HHH', 0, 1, count)
+    # GRPICONDIRENTRY: w(1) h(1) colorCount(1) reserved(1) planes(2) bitCount(2) bytesInRes(4) id(2)
+    for i, (w, h, cc, res2, planes, bc, size, img_off) in enumerate(entries):
+        grp += struct.pack('<BBBBHHIH', w, h, cc, res2, planes, bc, size, i + 1)
+    write_res_entry(14, 1, grp)
+    return out.getvalue()
+
+
+@functools.lru_cache(maxsize=None)
 def find_ilasm_path():
+    """Locate ilasm.exe in the newest installed .NET Framework.  The
+    result is cached: the directory walk runs once per session."""
     windir = os.environ.get("WINDIR", r"C:\Windows")
     base   = os.path.join(windir, "Microsoft.NET")
     for fw in ("Framework64", "Framework"):
@@ -126,17 +158,15 @@ def escape_il(s):
 
 def _strip_comment(s):
     """Remove // comment from a line, respecting string literals."""
-    out, in_str = [], False
-    i = 0
-    while i < len(s):
-        c = s[i]
-        if   c == '"' and not in_str: in_str = True;  out.append(c)
-        elif c == '"' and in_str:     in_str = False; out.append(c)
-        elif c == '/' and not in_str and i+1 < len(s) and s[i+1] == '/': break
-        else: out.append(c)
-        i += 1
-    return ''.join(out).rstrip()
+    if '//' not in s: return s.rstrip()
+    in_str = False
+    for i, c in enumerate(s):
+        if c == '"': in_str = not in_str
+        elif c == '/' and not in_str and s[i+1:i+2] == '/': return s[:i].rstrip()
+    return s.rstrip()
+
 
+_RE_HAVE_SPLIT = re.compile(r'  +(?=have )')
 
 def _split_stmts(s):
     """Split on 2+ spaces outside parens/brackets/quotes.
@@ -144,36 +174,37 @@ def _split_stmts(s):
     st = s.strip()
     if st.startswith('use '): return [st]
     if st.startswith('have '):
-        parts = re.split(r'  +(?=have )', st)
+        parts = _RE_HAVE_SPLIT.split(st)
         return [p.strip() for p in parts if p.strip()]
-    parts, cur = [], ''
+    if ';' not in s and '  ' not in s: return [st]
+    # Statements are slices of s between separators, so the scan only
+    # looks at each character once and never builds strings char by char.
+    parts = []
     depth_p = depth_b = 0
     in_str = False
-    i = 0
-    while i < len(s):
+    start = i = 0
+    n = len(s)
+    while i < n:
         c = s[i]
-        if   c == '"' and not in_str: in_str = True;  cur += c
-        elif c == '"' and in_str:     in_str = False; cur += c
-        elif not in_str and c == '(': depth_p += 1; cur += c
-        elif not in_str and c == ')': depth_p -= 1; cur += c
-        elif not in_str and c == '[': depth_b += 1; cur += c
-        elif not in_str and c == ']': depth_b -= 1; cur += c
-        elif not in_str and depth_p == 0 and depth_b == 0 and c == ';':
-            tok = cur.strip()
+        if c == '"': in_str = not in_str
+        elif in_str: pass
+        elif c == '(': depth_p += 1
+        elif c == ')': depth_p -= 1
+        elif c == '[': depth_b += 1
+        elif c == ']': depth_b -= 1
+        elif depth_p == 0 and depth_b == 0 and (
+                c == ';' or (c == ' ' and i+1 < n and s[i+1] == ' ')):
+            tok = s[start:i].strip()
             if tok: parts.append(tok)
-            cur = ''
-        elif (not in_str and depth_p == 0 and depth_b == 0
-              and c == ' ' and i+1 < len(s) and s[i+1] == ' '):
-            tok = cur.strip()
-            if tok: parts.append(tok)
-            cur = ''
-            while i < len(s) and s[i] == ' ': i += 1
+            i += 1
+            if c == ' ':
+                while i < n and s[i] == ' ': i += 1
+            start = i
             continue
-        else: cur += c
         i += 1
-    tok = cur.strip()
+    tok = s[start:].strip()
     if tok: parts.append(tok)
-    return parts or [s.strip()]
+    return parts or [st]
 
 
 def _expand_line(s, base_indent):
@@ -181,25 +212,19 @@ def _expand_line(s, base_indent):
     if '{' not in s and '}' not in s:
         return [' ' * base_indent + p for p in _split_stmts(s) if p.strip()]
     result = []
-    cur = ''
-    depth = 0
+    depth = depth_p = start = 0
     in_str = False
-    depth_p = 0
-    for ch in s:
-        if   ch == '"' and not in_str: in_str = True;  cur += ch
-        elif ch == '"' and in_str:     in_str = False; cur += ch
-        elif not in_str and ch == '(': depth_p += 1; cur += ch
-        elif not in_str and ch == ')': depth_p -= 1; cur += ch
-        elif not in_str and depth_p == 0 and ch == '{':
-            for sub in _split_stmts(cur):
-                if sub.strip(): result.append(' ' * (base_indent + depth*4) + sub.strip())
-            cur = ''; depth += 1
-        elif not in_str and depth_p == 0 and ch == '}':
-            for sub in _split_stmts(cur):
+    for i, ch in enumerate(s):
+        if ch == '"': in_str = not in_str
+        elif in_str: pass
+        elif ch == '(': depth_p += 1
+        elif ch == ')': depth_p -= 1
+        elif depth_p == 0 and (ch == '{' or ch == '}'):
+            for sub in _split_stmts(s[start:i]):
                 if sub.strip(): result.append(' ' * (base_indent + depth*4) + sub.strip())
-            cur = ''; depth = max(0, depth-1)
-        else: cur += ch
-    for sub in _split_stmts(cur):
+            start = i + 1
+            depth = depth + 1 if ch == '{' else max(0, depth-1)
+    for sub in _split_stmts(s[start:]):
         if sub.strip(): result.append(' ' * base_indent + sub.strip())
     return result
 
@@ -221,45 +246,27 @@ def preprocess(nova_text):
 
 # --- IL emitter ---------------------------------------------------------------
 
-class ILEmitter:
-    def __init__(self, name="NovaProgram"):
-        self.assembly      = name
-        self.fields        = {}
-        self.cctor         = []
-        self.handlers      = {}
-        self.handler_order = []
-        self.has_novaui    = False
-        self.has_novapc    = False
-        self.in_ui_window  = 0
-        self.win32_icon    = None  # set when icon("file.ico") is parsed
-        self._lbl          = 0
-        self._arrays       = {}
+# Wraps a static method in a System.Action delegate: the IL every UI
+# callback (window body, button, textbox, timer) is passed as.
+_NEW_ACTION = 'newobj instance void [mscorlib]System.Action::.ctor(object, native int)'
 
-    def ulabel(self, base):
-        self._lbl += 1
-        return f"{base}_{self._lbl}"
+def _action_il(cls, method):
+    return ['ldnull', f'ldftn void {cls}::{method}()', _NEW_ACTION]
 
-    def add_handler(self, name, body):
-        if name not in self.handlers:
-            self.handler_order.append(name)
-        self.handlers[name] = body
+# int32 / float64 on the stack -> string: box it and call Object.ToString().
+_TO_STRING_IL = {
+    "int":   ("box [mscorlib]System.Int32",
+              "callvirt instance string [mscorlib]System.Object::ToString()"),
+    "float": ("box [mscorlib]System.Double",
+              "callvirt instance string [mscorlib]System.Object::ToString()"),
+}
 
-    def get_il(self, main_lines):
-        A = self.assembly
-        il = [".assembly extern mscorlib {}"]
-        il += [f".assembly {A} {{}}", f".module {A}.exe\n",
-               f".class public auto ansi beforefieldinit {A} extends [mscorlib]System.Object {{"]
 
-        for n, t in self.fields.items():
-            ft = ("int32"   if t == "int"   else
-                  "float64" if t == "float" else
-                  "string"  if t == "string" else "class [mscorlib]System.String[]")
-            il.append(f"  .field public static {ft} {n}")
-
-        if self.has_novaui:
-            il.insert(0, ".assembly extern NovaUI {}")
+# Fixed helper methods written into every program by ILEmitter.get_il().
+# Blocks that mention the program class are str.format templates ({A} is
+# the class name, braces doubled); the rest are plain text.
 
-            il.append(f"""\
+_IL_UI_HELPERS = """\
   .method public hidebysig static void _CreateWindow(string, int32, int32) cil managed {{
     .maxstack 3
     ldarg.0
@@ -329,9 +336,10 @@ class ILEmitter:
     ret
   }}
 
-""")
-            il.append(f"""\
-  .method public hidebysig static int32 _AddButton(int32, int32, int32, int32, string, string) cil managed {{
+"""
+
+_IL_UI_BUTTONS = """\
+  .method public hidebysig static int32 _AddButton(int32, int32, int32, int32, string, string) cil managed {
     .maxstack 8
     ldarg 4
     ldarg.0
@@ -340,9 +348,9 @@ class ILEmitter:
     call void [NovaUI]NovaUI::button(string, int32, int32, class [mscorlib]System.Action)
     ldc.i4.0
     ret
-  }}
+  }
 
-  .method public hidebysig static int32 _AddButtonTagged(int32, int32, int32, int32, string, string, int32) cil managed {{
+  .method public hidebysig static int32 _AddButtonTagged(int32, int32, int32, int32, string, string, int32) cil managed {
     .maxstack 8
     ldarg 4
     ldarg.0
@@ -351,52 +359,51 @@ class ILEmitter:
     call void [NovaUI]NovaUI::button(string, int32, int32, class [mscorlib]System.Action)
     ldc.i4.0
     ret
-  }}
+  }
+
+"""
 
-""")
-            il.append(f"""\
-  .method public hidebysig static void _Dispatch() cil managed {{
+_IL_UI_DISPATCH = """\
+  .method public hidebysig static void _Dispatch() cil managed {
     .maxstack 0
     ret
-  }}
+  }
 
-""")
-            il.append(f"""\
-  .method public hidebysig static void _RegisterLabelName(string, int32) cil managed {{
+"""
+
+_IL_UI_LABELS = """\
+  .method public hidebysig static void _RegisterLabelName(string, int32) cil managed {
     .maxstack 2
     ldarg.0
     ldarg.1
     call void [NovaUI]NovaUI::_RegisterLabelName(string, int32)
     ret
-  }}
+  }
 
-  .method public hidebysig static int32 _GetLabelId(string) cil managed {{
+  .method public hidebysig static int32 _GetLabelId(string) cil managed {
     .maxstack 1
     ldarg.0
     call int32 [NovaUI]NovaUI::_GetLabelId(string)
     ret
-  }}
+  }
 
-  .method public hidebysig static void _SetLabelTextByName(string, string) cil managed {{
+  .method public hidebysig static void _SetLabelTextByName(string, string) cil managed {
     .maxstack 2
     ldarg.0
     ldarg.1
     call void [NovaUI]NovaUI::_SetLabelTextByName(string, string)
     ret
-  }}
+  }
 
-  .method public hidebysig static void _Noop() cil managed {{
+  .method public hidebysig static void _Noop() cil managed {
     .maxstack 0
     ret
-  }}
+  }
 
-""")
+"""
 
-        # --- ask (Console.ReadLine) wrapper -----------------------------------
-        # txtbox blocks swap this out at runtime via a handler field, but for
-        # console-mode Nova programs this just reads stdin.
-        il.append(f"""\
-  .method public hidebysig static string _ConsoleAsk(string) cil managed {{
+_IL_CONSOLE_ASK = """\
+  .method public hidebysig static string _ConsoleAsk(string) cil managed {
     .maxstack 2
     ldarg.0
     call void [mscorlib]System.Console::Write(string)
@@ -407,14 +414,11 @@ class ILEmitter:
     ldstr ""
   ASK_OK:
     ret
-  }}
+  }
 
-""")
+"""
 
-        # --- mem_write / mem_read wrappers ------------------------------------
-        # File-based IPC: writes to %TEMP%/nova_shm_<name>.txt
-        # Python can interop with plain open() on the same path.
-        il.append(f"""\
+_IL_MEM = """\
   .method public hidebysig static string _ShmPath(string) cil managed {{
     .maxstack 4
     call string [mscorlib]System.IO.Path::GetTempPath()
@@ -454,99 +458,93 @@ class ILEmitter:
     catch [mscorlib]System.Exception {{ pop ldstr "" ret }}
   }}
 
-""")
+"""
 
-        if self.has_novapc:
-            il.insert(0, ".assembly extern NovaPc {}")
-            il.append(f"""\
-  .method public hidebysig static string _PC_cpu() cil managed {{
+_IL_PC = """\
+  .method public hidebysig static string _PC_cpu() cil managed {
     .maxstack 1
     call string [NovaPc]NovaPc::cpu()
     ret
-  }}
+  }
 
-  .method public hidebysig static string _PC_ram() cil managed {{
+  .method public hidebysig static string _PC_ram() cil managed {
     .maxstack 1
     call string [NovaPc]NovaPc::ram()
     ret
-  }}
+  }
 
-  .method public hidebysig static string _PC_gpu() cil managed {{
+  .method public hidebysig static string _PC_gpu() cil managed {
     .maxstack 1
     call string [NovaPc]NovaPc::gpu()
     ret
-  }}
+  }
 
-  .method public hidebysig static string _PC_all_pc() cil managed {{
+  .method public hidebysig static string _PC_all_pc() cil managed {
     .maxstack 1
     call string [NovaPc]NovaPc::all_pc()
     ret
-  }}
+  }
 
-  .method public hidebysig static float64 _PC_cpu_val() cil managed {{
+  .method public hidebysig static float64 _PC_cpu_val() cil managed {
     .maxstack 1
     call float32 [NovaPc]NovaPc::cpu_val()
     conv.r8
     ret
-  }}
+  }
 
-  .method public hidebysig static float64 _PC_ram_used() cil managed {{
+  .method public hidebysig static float64 _PC_ram_used() cil managed {
     .maxstack 1
     call float32 [NovaPc]NovaPc::ram_used()
     conv.r8
     ret
-  }}
+  }
 
-  .method public hidebysig static float64 _PC_ram_total() cil managed {{
+  .method public hidebysig static float64 _PC_ram_total() cil managed {
     .maxstack 1
     call float32 [NovaPc]NovaPc::ram_total()
     conv.r8
     ret
-  }}
+  }
 
-  .method public hidebysig static float64 _PC_gpu_val() cil managed {{
+  .method public hidebysig static float64 _PC_gpu_val() cil managed {
     .maxstack 1
     call float32 [NovaPc]NovaPc::gpu_val()
     conv.r8
     ret
-  }}
-""")
+  }
+"""
 
-        if self.has_novaui:
-            il.append(f"""\
-  .method public hidebysig static void _SetPage(int32) cil managed {{
+_IL_UI_PAGES = """\
+  .method public hidebysig static void _SetPage(int32) cil managed {
     .maxstack 1
     ldarg.0
     call void [NovaUI]NovaUI::set_page(int32)
     ret
-  }}
+  }
 
-  .method public hidebysig static int32 _GetWidgetCount() cil managed {{
+  .method public hidebysig static int32 _GetWidgetCount() cil managed {
     .maxstack 1
     call int32 [NovaUI]NovaUI::_WidgetCount()
     ret
-  }}
+  }
 
-  .method public hidebysig static void _TagWidgets(int32, int32) cil managed {{
+  .method public hidebysig static void _TagWidgets(int32, int32) cil managed {
     .maxstack 2
     ldarg.0
     ldarg.1
     call void [NovaUI]NovaUI::_TagWidgets(int32, int32)
     ret
-  }}
+  }
 
-  .method public hidebysig static void _TagLast(int32) cil managed {{
+  .method public hidebysig static void _TagLast(int32) cil managed {
     .maxstack 1
     ldarg.0
     call void [NovaUI]NovaUI::_TagLastWidget(int32)
     ret
-  }}
-""")
+  }
+"""
 
-        # ── rand helpers ──────────────────────────────────────────────────────
-        # _RandRange(lo, hi) → int  :  picks integer in [lo, hi] inclusive
-        # _RandPick(int32[]) → int  :  picks one element from the array
-        il.append(f"""\
+_IL_RAND = """\
   .field private static class [mscorlib]System.Random _rng
 
   .method public hidebysig static int32 _RandRange(int32, int32) cil managed {{
@@ -574,35 +572,111 @@ class ILEmitter:
     ldelem.i4
     ret
   }}
-""")
+"""
+
+
+class ILEmitter:
+    def __init__(self, name="NovaProgram"):
+        self.assembly      = name
+        self.fields        = {}
+        self.cctor         = []
+        self.handlers      = {}
+        self.handler_order = []
+        self.has_novaui    = False
+        self.has_novapc    = False
+        self.in_ui_window  = 0
+        self.win32_icon    = None  # set when icon("file.ico") is parsed
+        self.win32_icon_ext = ""   # its lower-cased extension, e.g. ".ico"
+        self._lbl          = 0
+        self._arrays       = {}
+
+    def ulabel(self, base):
+        self._lbl += 1
+        return f"{base}_{self._lbl}"
+
+    def add_handler(self, name, body):
+        if name not in self.handlers:
+            self.handler_order.append(name)
+        self.handlers[name] = body
+
+    def get_il(self, main_lines):
+        A = self.assembly
+        # The IL is written straight into one buffer: emit() writes each
+        # chunk plus a newline, emit_body() a whole method body indented.
+        buf  = io.StringIO()
+        w    = buf.write
+        def emit(*chunks):
+            for c in chunks: w(c); w("\n")
+        def emit_body(lines):
+            if lines: w("    "); w("\n    ".join(lines)); w("\n")
+
+        if self.has_novapc: emit(".assembly extern NovaPc {}")
+        if self.has_novaui: emit(".assembly extern NovaUI {}")
+        emit(".assembly extern mscorlib {}",
+             f".assembly {A} {{}}", f".module {A}.exe\n",
+             f".class public auto ansi beforefieldinit {A} extends [mscorlib]System.Object {{")
+
+        for n, t in self.fields.items():
+            ft = ("int32"   if t == "int"   else
+                  "float64" if t == "float" else
+                  "string"  if t == "string" else "class [mscorlib]System.String[]")
+            emit(f"  .field public static {ft} {n}")
+
+        if self.has_novaui:
+            emit(_IL_UI_HELPERS.format(A=A))
+            emit(_IL_UI_BUTTONS)
+            emit(_IL_UI_DISPATCH)
+            emit(_IL_UI_LABELS)
+
+        # --- ask (Console.ReadLine) wrapper -----------------------------------
+        # txtbox blocks swap this out at runtime via a handler field, but for
+        # console-mode Nova programs this just reads stdin.
+        emit(_IL_CONSOLE_ASK)
+
+        # --- mem_write / mem_read wrappers ------------------------------------
+        # File-based IPC: writes to %TEMP%/nova_shm_<name>.txt
+        # Python can interop with plain open() on the same path.
+        emit(_IL_MEM.format(A=A))
+
+        if self.has_novapc:
+            emit(_IL_PC)
+
+        if self.has_novaui:
+            emit(_IL_UI_PAGES)
+
+        # ── rand helpers ──────────────────────────────────────────────────────
+        # _RandRange(lo, hi) → int  :  picks integer in [lo, hi] inclusive
+        # _RandPick(int32[]) → int  :  picks one element from the array
+        emit(_IL_RAND.format(A=A))
         # initialise _rng in cctor — seeded with Environment.TickCount for proper randomness
-        self.cctor = [
+        # (built as a local so get_il() can be called again on a cached emitter)
+        cctor = [
             f'call int32 [mscorlib]System.Environment::get_TickCount()',
             f'newobj instance void [mscorlib]System.Random::.ctor(int32)',
             f'stsfld class [mscorlib]System.Random {A}::_rng',
         ] + self.cctor
 
-        il += ["\n  .method private hidebysig specialname rtspecialname static void .cctor() cil managed {",
-               "    .maxstack 10"]
-        for ln in self.cctor: il.append("    " + ln)
-        il.append("    ret\n  }\n")
+        emit("\n  .method private hidebysig specialname rtspecialname static void .cctor() cil managed {",
+               "    .maxstack 10")
+        emit_body(cctor)
+        emit("    ret\n  }\n")
 
-        il += ["  .method public hidebysig static void Main() cil managed {",
+        emit("  .method public hidebysig static void Main() cil managed {",
                "    .entrypoint", "    .maxstack 8", f"    call void {A}::StartApp()", "    ret\n  }",
                f"\n  .method public hidebysig static void StartApp() cil managed {{",
-               "    .maxstack 64"]
-        for ln in main_lines: il.append("    " + ln)
-        il.append("    ret\n  }\n")
+               "    .maxstack 64")
+        emit_body(main_lines)
+        emit("    ret\n  }\n")
 
         for hname in self.handler_order:
             body = self.handlers[hname]
-            il += [f"  .method public hidebysig static void {hname}() cil managed {{",
-                   "    .maxstack 64"]
-            for ln in body: il.append("    " + ln)
-            il.append("    ret\n  }\n")
+            emit(f"  .method public hidebysig static void {hname}() cil managed {{",
+                   "    .maxstack 64")
+            emit_body(body)
+            emit("    ret\n  }\n")
 
-        il.append("}")
-        return "\n".join(il)
+        w("}")
+        return buf.getvalue()
 
 
 # --- expression parser --------------------------------------------------------
@@ -658,12 +732,7 @@ def make_parser(emitter, read_file_paths):
         if t == "int": il.append('conv.r8')
 
     def to_string(t, il):
-        if t == "int":
-            il += ["box [mscorlib]System.Int32",
-                   "callvirt instance string [mscorlib]System.Object::ToString()"]
-        elif t == "float":
-            il += ["box [mscorlib]System.Double",
-                   "callvirt instance string [mscorlib]System.Object::ToString()"]
+        il += _TO_STRING_IL.get(t, ())
 
     def prec(toks, pos, il, lvl):
         if lvl >= len(_PREC_LEVELS): return unary(toks, pos, il)
@@ -909,7 +978,108 @@ def make_parser(emitter, read_file_paths):
 
 # --- block compiler -----------------------------------------------------------
 
+# Statement keyword (leading word) of every line at once: run over the
+# newline-joined statements, findall yields exactly one match per line.
+_KW_RE = re.compile(r'^\w*', re.MULTILINE)
+
+
+class _LineStream:
+    """
+    Forward-only cursor over the translator's preprocessed lines.
+    head is the current (indent, stmt, text, keyword) tuple, or None at
+    the end, and advance() moves past it.  compile_block() and the block
+    handlers share one stream: a nested block consumes lines up to its
+    dedent and leaves the rest for its caller.
+    """
+    __slots__ = ('head', '_next')
+
+    def __init__(self, lines):
+        self._next = iter(lines).__next__
+        self.advance()
+
+    def advance(self):
+        try: self.head = self._next()
+        except StopIteration: self.head = None
+
+def _split_args(s):
+    """Split s on top-level commas in one pass, skipping commas inside
+    "strings" and nested ()/[].  Returns the stripped pieces."""
+    parts, start, depth, in_str = [], 0, 0, False
+    for i, c in enumerate(s):
+        if c == '"':
+            in_str = not in_str
+        elif in_str:
+            continue
+        elif c in '([':
+            depth += 1
+        elif c in ')]':
+            depth -= 1
+        elif c == ',' and depth == 0:
+            parts.append(s[start:i].strip()); start = i + 1
+    parts.append(s[start:].strip())
+    return parts
+
+# Statement patterns, compiled once at import rather than looked up in
+# re's cache for every source line.  The handlers in _translate() use them.
+_RE_HAVE             = re.compile(r'^have\s+(\w+)\s*=\s*(.+)$')
+_RE_FLOAT_LIT        = re.compile(r'^-?\d+\.\d+$')
+_RE_USE              = re.compile(r'^use\s+\w+')
+_RE_PAGE             = re.compile(r'^page\s*\(\s*(\d+)\s*\)$')
+_RE_SET_PAGE         = re.compile(r'^set_page\s*\(\s*(.+)\s*\)$')
+_RE_COLORS           = re.compile(r'^colou?rs\s*\(')
+_RE_COLORS_PRESET    = re.compile(r'^colou?rs\s*\(\s*"?([^")]*)"?\s*\)')
+_RE_COLOR_KEY        = re.compile(r'(bg|txt|text|accent)\s*=\s*(#[0-9A-Fa-f]{6})')
+_RE_UI_WINDOW_3COL   = re.compile(r'^ui_window\s*\(\s*"([^"]+)"\s*,\s*(\d+)\s*,\s*(\d+)\s*,\s*(#[0-9A-Fa-f]{6})\s*,\s*(#[0-9A-Fa-f]{6})\s*,\s*(#[0-9A-Fa-f]{6})\s*\)$')
+_RE_UI_WINDOW        = re.compile(r'^ui_window\s*\(\s*"([^"]+)"\s*,\s*(\d+)\s*,\s*(\d+)\s*(?:,\s*(#[0-9A-Fa-f]{6}))?\s*\)$')
+_RE_BUTTON           = re.compile(r'^button\s*\(\s*"([^"]+)"\s*,\s*(\d+)\s*,\s*(\d+)\s*(?:,\s*(\d+)\s*,\s*(\d+)\s*)?(?:,\s*(#[0-9A-Fa-f]{6}))?\s*\)$')
+_RE_BUTTON_GRID      = re.compile(r'^button_grid\s*\(\s*(\w+)\s*,\s*(\w+)\s*,\s*(\w+)\s*,\s*(\d+)\s*,\s*(\d+)\s*,\s*"([^"]+)"\s*\)$')
+_RE_ON_BUTTON        = re.compile(r'^on_button\s*\(\s*"([^"]+)"\s*,\s*(\d+)\s*\)$')
+_RE_NAMED_LABEL      = re.compile(r'^named_label\s*\(\s*"([^"]+)"\s*,\s*"([^"]*)"\s*,\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*\)$')
+_RE_SET_LABEL        = re.compile(r'^set_label\s*\(\s*"([^"]+)"\s*,\s*(.+)\s*\)$')
+_RE_LABEL_EXPR       = re.compile(r'^label\s*\(\s*"([^"]+)"\s*,\s*(.+)\s*\)$')
+_RE_LABEL_POS        = re.compile(r'^label\s*\(\s*"[^"]+"\s*,\s*\d+')
+_RE_LABEL_3          = re.compile(r'^label\s*\(\s*"([^"]+)"\s*,\s*(\d+)\s*,\s*(\d+)\s*(?:,\s*(#[0-9A-Fa-f]{6}))?\s*\)$')
+_RE_LABEL_5          = re.compile(r'^label\s*\(\s*"([^"]+)"\s*,\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*(?:,\s*(#[0-9A-Fa-f]{6}))?\s*\)$')
+_RE_TXTBOX           = re.compile(r'^txtbox\s*\(\s*"([^"]+)"\s*(?:,\s*"([^"]*)"\s*)?(?:,\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*)?\)$')
+_RE_ASK              = re.compile(r'^ask\s*\(\s*(.*)\s*\)$')
+_RE_MEM_WRITE        = re.compile(r'^mem_write\s*\(\s*"([^"]+)"\s*,\s*(.+)\s*\)$')
+_RE_CLICKED          = re.compile(r'^clicked\s*(?:\(\s*\))?$')
+_RE_WHEN             = re.compile(r'^when\s*\((.+)\)$')
+_RE_WHENWISE         = re.compile(r'^(?:whenwise|ww)\s*\((.+)\)$')
+_RE_WHILE            = re.compile(r'^while\s*\((.+)\)$')
+_RE_DIGITS           = re.compile(r'^\d+$')
+_RE_REPEAT           = re.compile(r'^repeat\s+(.+)$')
+_RE_PUT              = re.compile(r'^put\s*\(\s*(.+)\s*\)$')
+_RE_UI_MESSAGE       = re.compile(r'^ui_message\s*\(\s*(.+)\s*\)$')
+_RE_ICON             = re.compile(r'^icon\s*\(\s*"([^"]+)"\s*\)$')
+_RE_WRITE_FILE       = re.compile(r'^write_file\s*\(\s*"([^"]+)"\s*,\s*(.+)\s*\)$')
+_RE_PAUSE            = re.compile(r'^pause\s*\((.+)\)$')
+_RE_READ_FILE_ASSIGN = re.compile(r'^(\w+)\s*=\s*read_file\s*\(\s*"([^"]+)"\s*\)$')
+_RE_INDEX_ASSIGN     = re.compile(r'^([A-Za-z_]\w*)\s*\[(.+?)\]\s*=\s*(.+)$')
+_RE_ASSIGN           = re.compile(r'^(\w+)\s*=\s*(.+)$')
+
+_TRANSLATE_CACHE      = collections.OrderedDict()   # (sha1 of source, assembly name) -> (emitter, read_file_paths)
+_TRANSLATE_CACHE_MAX  = 32
+_TRANSLATE_CACHE_LOCK = threading.Lock()
+
 def translate_nova_to_il(nova_text, assembly_name="NovaProgram"):
+    """Translate Nova source to an ILEmitter.  Results are memoized on the
+    source hash (the newest 32), so recompiling an unchanged file skips
+    translation."""
+    key = (hashlib.sha1(nova_text.encode('utf-8')).digest(), assembly_name)
+    with _TRANSLATE_CACHE_LOCK:
+        hit = _TRANSLATE_CACHE.get(key)
+        if hit is not None:
+            _TRANSLATE_CACHE.move_to_end(key)
+            return hit
+    hit = _translate(nova_text, assembly_name)
+    with _TRANSLATE_CACHE_LOCK:
+        _TRANSLATE_CACHE[key] = hit
+        if len(_TRANSLATE_CACHE) > _TRANSLATE_CACHE_MAX: _TRANSLATE_CACHE.popitem(last=False)
+    return hit
+
+
+def _translate(nova_text, assembly_name):
     lines           = preprocess(nova_text)
     emitter         = ILEmitter(assembly_name)
     read_file_paths = set()
@@ -917,18 +1087,26 @@ def translate_nova_to_il(nova_text, assembly_name="NovaProgram"):
     parse, ensure_int = make_parser(emitter, read_file_paths)
     A = emitter.assembly
 
+    # Each line is stripped, measured and keyed by its leading word once
+    # here.  compile_block() and the block handlers walk one shared stream
+    # of (indent, statement, stripped line, keyword) tuples.
+    stripped = [l.strip() for l in lines]
+    stmts    = [t.rstrip('{').rstrip() for t in stripped]
+    indents  = [len(l) - len(l.lstrip()) for l in lines]
+    keywords = _KW_RE.findall("\n".join(stmts)) if stmts else []
+    src      = _LineStream(zip(indents, stmts, stripped, keywords))
+
     # Pre-pass: scan for all variable assignments and register field TYPES only
     # (no cctor emissions, the main compiler handles initialization).
     # This ensures that when a variable is first READ inside a handler before
     # being assigned, the field type is already known so store() can coerce correctly.
-    import re as _re
-    for _line in lines:
-        _s = _line.strip().rstrip('{').rstrip()
-        _m = _re.match(r'^have\s+(\w+)\s*=\s*(.+)$', _s)
+    for _s, _kw in zip(stmts, keywords):
+        if _kw != 'have': continue
+        _m = _RE_HAVE.match(_s)
         if _m:
             _n, _expr = _m.group(1), _m.group(2).strip()
             if _n not in emitter.fields:
-                if _re.match(r'^-?\d+\.\d+$', _expr):
+                if _RE_FLOAT_LIT.match(_expr):
                     emitter.fields[_n] = "float"
                 elif _expr.lstrip('-').isdigit():
                     emitter.fields[_n] = "int"
@@ -939,601 +1117,792 @@ def translate_nova_to_il(nova_text, assembly_name="NovaProgram"):
         # plain assignments: don't pre-declare — main compiler handles these
         # correctly when it processes them in order
 
-    def get_indent(line): return len(line) - len(line.lstrip())
-
     def store(name, t, il):
         ft = "int32" if t=="int" else "float64" if t=="float" else "string"
         il.append(f'stsfld {ft} {A}::{name}')
 
     def coerce_to_string(t, il):
-        if t == "int":
-            il += ["box [mscorlib]System.Int32",
-                   "callvirt instance string [mscorlib]System.Object::ToString()"]
-        elif t == "float":
-            il += ["box [mscorlib]System.Double",
-                   "callvirt instance string [mscorlib]System.Object::ToString()"]
-
-    def compile_block(start, min_indent):
-        il  = []
-        idx = start
-        while idx < len(lines):
-            line   = lines[idx]
-            indent = get_indent(line)
-            if indent < min_indent: break
-            s = line.strip().rstrip('{').rstrip()
-
-            # use
-            if re.match(r'^use\s+\w+', s):
-                if 'novaui' in s: emitter.has_novaui = True
-                if 'novapc' in s: emitter.has_novapc = True
-                idx += 1; continue
-
-            # have
-            m = re.match(r'^have\s+(\w+)\s*=\s*(.+)$', s)
-            if m:
-                name, val = m.group(1), m.group(2).strip()
-                if val.startswith('['):
-                    items = [x.strip().strip('"') for x in val[1:-1].split(',')]
-                    emitter._arrays[name] = items
-                    emitter.fields[name]  = "string[]"
-                    emitter.cctor += [f'ldc.i4 {len(items)}',
-                                      'newarr [mscorlib]System.String']
-                    for i, it in enumerate(items):
-                        emitter.cctor += ['dup', f'ldc.i4 {i}',
-                                          f'ldstr "{escape_il(it)}"', 'stelem.ref']
-                    emitter.cctor.append(f'stsfld class [mscorlib]System.String[] {A}::{name}')
-                elif val.lstrip('-').isdigit():
-                    emitter.fields[name] = "int"
-                    emitter.cctor += [f'ldc.i4 {val}', f'stsfld int32 {A}::{name}']
-                elif re.match(r'^-?\d+\.\d+$', val):
-                    emitter.fields[name] = "float"
-                    emitter.cctor += [f'ldc.r8 {val}', f'stsfld float64 {A}::{name}']
-                elif val.startswith('"') and val.endswith('"'):
-                    emitter.fields[name] = "string"
-                    emitter.cctor += [f'ldstr "{escape_il(val[1:-1])}"',
-                                      f'stsfld string {A}::{name}']
-                else:
-                    t = parse(val, [])
-                    emitter.fields[name] = t
-                    parse(val, emitter.cctor)
-                    store(name, t, emitter.cctor)
-                idx += 1; continue
-
-            # page(N) { ... }
-            # Tags all widgets created inside the block with page N.
-            # set_page(N) at runtime switches the visible page.
-            m = re.match(r'^page\s*\(\s*(\d+)\s*\)$', s)
-            if m:
-                page_num = int(m.group(1))
-                # snapshot widget count before compiling body
-                il += [f'call int32 {A}::_GetWidgetCount()']
-                # store in a temp field
-                count_field = f'_pg_snap_{page_num}_{emitter.ulabel("PG")}'
-                emitter.fields[count_field] = 'int'
-                emitter.cctor += ['ldc.i4.0', f'stsfld int32 {A}::{count_field}']
-                il.append(f'stsfld int32 {A}::{count_field}')
-                # compile body
-                body_il, idx = compile_block(idx+1, indent+1)
-                il += body_il
-                # tag all widgets added since the snapshot
-                il += [f'ldsfld int32 {A}::{count_field}',
-                       f'ldc.i4 {page_num}',
-                       f'call void {A}::_TagWidgets(int32, int32)']
-                continue
-
-            # set_page(N) — switch active page at runtime
-            m = re.match(r'^set_page\s*\(\s*(.+)\s*\)$', s)
-            if m:
-                t = parse(m.group(1).strip(), il)
-                if t == 'float': il.append('conv.i4')
-                il.append(f'call void {A}::_SetPage(int32)')
-                idx += 1; continue
-
-            # colors(preset) { txt=#hex bg=#hex accent=#hex }
-            # colours(...) is accepted as an alias.
-            if re.match(r'^colou?rs\s*\(', s):
-                emitter.has_novaui = True
-                pm = re.match(r'^colou?rs\s*\(\s*"?([^")]*)"?\s*\)', s)
-                preset = pm.group(1).strip() if pm else ""
-                inner_lines = []
-                tmp_idx = idx + 1
-                while tmp_idx < len(lines):
-                    ln = lines[tmp_idx].strip()
-                    if get_indent(lines[tmp_idx]) <= indent and ln not in ('', '{', '}'):
-                        break
-                    if ln and ln not in ('{', '}'):
-                        inner_lines.append(ln)
-                    tmp_idx += 1
-                idx = tmp_idx
-                if preset:
-                    il.append(f'ldstr "{escape_il(preset)}"\n    call void [NovaUI]NovaUI::_apply_preset(string)')
-                for ln in inner_lines:
-                    cm = re.match(r'(bg|txt|text|accent)\s*=\s*(#[0-9A-Fa-f]{6})', ln)
-                    if cm:
-                        key, val = cm.group(1), cm.group(2)
-                        if key == 'bg':
-                            il += [f'ldstr "{escape_il(val)}"',
-                                   'call void [NovaUI]NovaUI::set_bg(string)']
-                        elif key in ('txt', 'text'):
-                            il += [f'ldstr "{escape_il(val)}"',
-                                   'call void [NovaUI]NovaUI::set_text(string)']
-                        elif key == 'accent':
-                            il += [f'ldstr "{escape_il(val)}"',
-                                   'call void [NovaUI]NovaUI::set_accent(string)']
-                continue
-
-            # ui_window("title", w, h) { }
-            # ui_window("title", w, h, #accent) { }
-            # ui_window("title", w, h, #bg, #accent, #text) { }
-            m1 = re.match(r'^ui_window\s*\(\s*"([^"]+)"\s*,\s*(\d+)\s*,\s*(\d+)\s*,\s*(#[0-9A-Fa-f]{6})\s*,\s*(#[0-9A-Fa-f]{6})\s*,\s*(#[0-9A-Fa-f]{6})\s*\)$', s)
-            m2 = re.match(r'^ui_window\s*\(\s*"([^"]+)"\s*,\s*(\d+)\s*,\s*(\d+)\s*(?:,\s*(#[0-9A-Fa-f]{6}))?\s*\)$', s) if not m1 else None
-            m = m1 or m2
-            if m:
-                emitter.has_novaui = True
-                emitter.in_ui_window += 1
-                inner, idx = compile_block(idx+1, indent+1)
-                emitter.in_ui_window -= 1
-                body_name = "_WindowBody_" + emitter.ulabel('WB')
-                emitter.add_handler(body_name, inner)
-                action_il = ['ldnull',
-                             'ldftn void ' + A + '::' + body_name + '()',
-                             'newobj instance void [mscorlib]System.Action::.ctor(object, native int)']
-                if m1:
-                    title, w, h = m1.group(1), m1.group(2), m1.group(3)
-                    bg, acc, txt = m1.group(4), m1.group(5), m1.group(6)
-                    il += ['ldstr "' + escape_il(title) + '"',
-                           'ldc.i4 ' + w, 'ldc.i4 ' + h,
-                           'ldstr "' + escape_il(bg) + '"',
-                           'ldstr "' + escape_il(acc) + '"',
-                           'ldstr "' + escape_il(txt) + '"'] + action_il + [
-                           'call void [NovaUI]NovaUI::ui_window(string, int32, int32, string, string, string, class [mscorlib]System.Action)']
-                elif m2.group(4):
-                    title, w, h, acc = m2.group(1), m2.group(2), m2.group(3), m2.group(4)
-                    il += ['ldstr "' + escape_il(title) + '"',
-                           'ldc.i4 ' + w, 'ldc.i4 ' + h,
-                           'ldstr "' + escape_il(acc) + '"'] + action_il + [
-                           'call void [NovaUI]NovaUI::ui_window(string, int32, int32, string, class [mscorlib]System.Action)']
-                else:
-                    title, w, h = m2.group(1), m2.group(2), m2.group(3)
-                    il += ['ldstr "' + escape_il(title) + '"',
-                           'ldc.i4 ' + w, 'ldc.i4 ' + h] + action_il + [
-                           'call void [NovaUI]NovaUI::ui_window(string, int32, int32, class [mscorlib]System.Action)']
-                continue
-
-            # button
-            m = re.match(r'^button\s*\(\s*"([^"]+)"\s*,\s*(\d+)\s*,\s*(\d+)\s*(?:,\s*(\d+)\s*,\s*(\d+)\s*)?(?:,\s*(#[0-9A-Fa-f]{6}))?\s*\)$', s)
-            if m:
-                txt, x, y = m.group(1), m.group(2), m.group(3)
-                bw     = m.group(4) or '120'
-                bh     = m.group(5) or '30'
-                hexcol = m.group(6)
-                hname  = "H_" + str(handler_counter[0]); handler_counter[0] += 1
-                inner, idx = compile_block(idx+1, indent+1)
-                emitter.add_handler(hname, inner)
-                if hexcol:
-                    il += ['ldstr "' + escape_il(txt) + '"',
-                           'ldc.i4 ' + x, 'ldc.i4 ' + y, 'ldc.i4 ' + bw, 'ldc.i4 ' + bh,
-                           'ldstr "' + escape_il(hexcol) + '"',
-                           'ldnull',
-                           'ldftn void ' + A + '::' + hname + '()',
-                           'newobj instance void [mscorlib]System.Action::.ctor(object, native int)',
-                           'call void [NovaUI]NovaUI::button(string, int32, int32, int32, int32, string, class [mscorlib]System.Action)']
-                else:
-                    il += ['ldstr "' + escape_il(txt) + '"',
-                           'ldc.i4 ' + x, 'ldc.i4 ' + y, 'ldc.i4 ' + bw, 'ldc.i4 ' + bh,
-                           'ldnull',
-                           'ldftn void ' + A + '::' + hname + '()',
-                           'newobj instance void [mscorlib]System.Action::.ctor(object, native int)',
-                           'call void [NovaUI]NovaUI::button(string, int32, int32, int32, int32, class [mscorlib]System.Action)']
-                continue
-
-            # button_grid
-            m = re.match(r'^button_grid\s*\(\s*(\w+)\s*,\s*(\w+)\s*,\s*(\w+)\s*,\s*(\d+)\s*,\s*(\d+)\s*,\s*"([^"]+)"\s*\)$', s)
-            if m:
-                lv, xv, yv, bw, bh, prefix = m.groups()
-                labels = emitter._arrays.get(lv, [])
-                xs     = emitter._arrays.get(xv, [])
-                ys     = emitter._arrays.get(yv, [])
-                for i, lbl in enumerate(labels):
-                    hname = prefix + "_" + str(i)
-                    if hname not in emitter.handlers:
-                        emitter.add_handler(hname, [])
-                    il += ['ldstr "' + escape_il(lbl) + '"',
-                           'ldc.i4 ' + str(xs[i]),
-                           'ldc.i4 ' + str(ys[i]),
-                           'ldc.i4 ' + bw,
-                           'ldc.i4 ' + bh,
-                           'ldnull',
-                           'ldftn void ' + A + '::' + hname + '()',
-                           'newobj instance void [mscorlib]System.Action::.ctor(object, native int)',
-                           'call void [NovaUI]NovaUI::button(string, int32, int32, int32, int32, class [mscorlib]System.Action)']
-                idx += 1; continue
-
-            # on_button
-            m = re.match(r'^on_button\s*\(\s*"([^"]+)"\s*,\s*(\d+)\s*\)$', s)
-            if m:
-                prefix, bidx = m.groups()
-                hname = prefix + "_" + bidx
-                inner, idx = compile_block(idx+1, indent+1)
-                emitter.add_handler(hname, inner)
-                continue
-
-            # named_label
-            m = re.match(r'^named_label\s*\(\s*"([^"]+)"\s*,\s*"([^"]*)"\s*,\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*\)$', s)
-            if m:
-                lid, txt, x, y, w, h = m.groups()
-                il += [f'ldstr "{escape_il(lid)}"', f'ldstr "{escape_il(txt)}"',
+        il += _TO_STRING_IL.get(t, ())
+
+    # use
+    def h_use(s, indent, il):
+        if _RE_USE.match(s):
+            if 'novaui' in s: emitter.has_novaui = True
+            if 'novapc' in s: emitter.has_novapc = True
+            return True
+
+    # have
+    def h_have(s, indent, il):
+        m = _RE_HAVE.match(s)
+        if m:
+            name, val = m.group(1), m.group(2).strip()
+            if val.startswith('['):
+                items = [x.strip('"') for x in _split_args(val[1:-1])]
+                emitter._arrays[name] = items
+                emitter.fields[name]  = "string[]"
+                emitter.cctor += [f'ldc.i4 {len(items)}',
+                                  'newarr [mscorlib]System.String']
+                for i, it in enumerate(items):
+                    emitter.cctor += ['dup', f'ldc.i4 {i}',
+                                      f'ldstr "{escape_il(it)}"', 'stelem.ref']
+                emitter.cctor.append(f'stsfld class [mscorlib]System.String[] {A}::{name}')
+            elif val.lstrip('-').isdigit():
+                emitter.fields[name] = "int"
+                emitter.cctor += [f'ldc.i4 {val}', f'stsfld int32 {A}::{name}']
+            elif _RE_FLOAT_LIT.match(val):
+                emitter.fields[name] = "float"
+                emitter.cctor += [f'ldc.r8 {val}', f'stsfld float64 {A}::{name}']
+            elif val.startswith('"') and val.endswith('"'):
+                emitter.fields[name] = "string"
+                emitter.cctor += [f'ldstr "{escape_il(val[1:-1])}"',
+                                  f'stsfld string {A}::{name}']
+            else:
+                t = parse(val, [])
+                emitter.fields[name] = t
+                parse(val, emitter.cctor)
+                store(name, t, emitter.cctor)
+            return True
+
+    # page(N) { ... }
+    # Tags all widgets created inside the block with page N.
+    # set_page(N) at runtime switches the visible page.
+    def h_page(s, indent, il):
+        m = _RE_PAGE.match(s)
+        if m:
+            page_num = int(m.group(1))
+            # snapshot widget count before compiling body
+            il += [f'call int32 {A}::_GetWidgetCount()']
+            # store in a temp field
+            count_field = f'_pg_snap_{page_num}_{emitter.ulabel("PG")}'
+            emitter.fields[count_field] = 'int'
+            emitter.cctor += ['ldc.i4.0', f'stsfld int32 {A}::{count_field}']
+            il.append(f'stsfld int32 {A}::{count_field}')
+            # compile body
+            body_il = compile_block(indent+1)
+            il += body_il
+            # tag all widgets added since the snapshot
+            il += [f'ldsfld int32 {A}::{count_field}',
+                   f'ldc.i4 {page_num}',
+                   f'call void {A}::_TagWidgets(int32, int32)']
+            return True
+
+    # set_page(N) — switch active page at runtime
+    def h_set_page(s, indent, il):
+        m = _RE_SET_PAGE.match(s)
+        if m:
+            t = parse(m.group(1).strip(), il)
+            if t == 'float': il.append('conv.i4')
+            il.append(f'call void {A}::_SetPage(int32)')
+            return True
+
+    # colors(preset) { txt=#hex bg=#hex accent=#hex }
+    # colours(...) is accepted as an alias.
+    def h_colors(s, indent, il):
+        if _RE_COLORS.match(s):
+            emitter.has_novaui = True
+            pm = _RE_COLORS_PRESET.match(s)
+            preset = pm.group(1).strip() if pm else ""
+            inner_lines = []
+            while src.head is not None:
+                ln_indent, _, ln, _ = src.head
+                if ln_indent <= indent and ln not in ('', '{', '}'):
+                    break
+                if ln and ln not in ('{', '}'):
+                    inner_lines.append(ln)
+                src.advance()
+            if preset:
+                il.append(f'ldstr "{escape_il(preset)}"\n    call void [NovaUI]NovaUI::_apply_preset(string)')
+            for ln in inner_lines:
+                cm = _RE_COLOR_KEY.match(ln)
+                if cm:
+                    key, val = cm.group(1), cm.group(2)
+                    if key == 'bg':
+                        il += [f'ldstr "{escape_il(val)}"',
+                               'call void [NovaUI]NovaUI::set_bg(string)']
+                    elif key in ('txt', 'text'):
+                        il += [f'ldstr "{escape_il(val)}"',
+                               'call void [NovaUI]NovaUI::set_text(string)']
+                    elif key == 'accent':
+                        il += [f'ldstr "{escape_il(val)}"',
+                               'call void [NovaUI]NovaUI::set_accent(string)']
+            return True
+
+    # ui_window("title", w, h) { }
+    # ui_window("title", w, h, #accent) { }
+    # ui_window("title", w, h, #bg, #accent, #text) { }
+    def h_ui_window(s, indent, il):
+        m1 = _RE_UI_WINDOW_3COL.match(s)
+        m2 = _RE_UI_WINDOW.match(s) if not m1 else None
+        m = m1 or m2
+        if m:
+            emitter.has_novaui = True
+            emitter.in_ui_window += 1
+            inner = compile_block(indent+1)
+            emitter.in_ui_window -= 1
+            body_name = f"_WindowBody_{emitter.ulabel('WB')}"
+            emitter.add_handler(body_name, inner)
+            action_il = _action_il(A, body_name)
+            if m1:
+                title, w, h = m1.group(1), m1.group(2), m1.group(3)
+                bg, acc, txt = m1.group(4), m1.group(5), m1.group(6)
+                il += [f'ldstr "{escape_il(title)}"', f'ldc.i4 {w}', f'ldc.i4 {h}',
+                       f'ldstr "{escape_il(bg)}"',
+                       f'ldstr "{escape_il(acc)}"',
+                       f'ldstr "{escape_il(txt)}"', *action_il,
+                       'call void [NovaUI]NovaUI::ui_window(string, int32, int32, string, string, string, class [mscorlib]System.Action)']
+            elif m2.group(4):
+                title, w, h, acc = m2.group(1), m2.group(2), m2.group(3), m2.group(4)
+                il += [f'ldstr "{escape_il(title)}"', f'ldc.i4 {w}', f'ldc.i4 {h}',
+                       f'ldstr "{escape_il(acc)}"', *action_il,
+                       'call void [NovaUI]NovaUI::ui_window(string, int32, int32, string, class [mscorlib]System.Action)']
+            else:
+                title, w, h = m2.group(1), m2.group(2), m2.group(3)
+                il += [f'ldstr "{escape_il(title)}"', f'ldc.i4 {w}', f'ldc.i4 {h}', *action_il,
+                       'call void [NovaUI]NovaUI::ui_window(string, int32, int32, class [mscorlib]System.Action)']
+            return True
+
+    # button
+    def h_button(s, indent, il):
+        m = _RE_BUTTON.match(s)
+        if m:
+            txt, x, y = m.group(1), m.group(2), m.group(3)
+            bw     = m.group(4) or '120'
+            bh     = m.group(5) or '30'
+            hexcol = m.group(6)
+            hname  = f"H_{handler_counter[0]}"; handler_counter[0] += 1
+            inner = compile_block(indent+1)
+            emitter.add_handler(hname, inner)
+            if hexcol:
+                il += [f'ldstr "{escape_il(txt)}"',
+                       f'ldc.i4 {x}', f'ldc.i4 {y}', f'ldc.i4 {bw}', f'ldc.i4 {bh}',
+                       f'ldstr "{escape_il(hexcol)}"',
+                       *_action_il(A, hname),
+                       'call void [NovaUI]NovaUI::button(string, int32, int32, int32, int32, string, class [mscorlib]System.Action)']
+            else:
+                il += [f'ldstr "{escape_il(txt)}"',
+                       f'ldc.i4 {x}', f'ldc.i4 {y}', f'ldc.i4 {bw}', f'ldc.i4 {bh}',
+                       *_action_il(A, hname),
+                       'call void [NovaUI]NovaUI::button(string, int32, int32, int32, int32, class [mscorlib]System.Action)']
+            return True
+
+    # button_grid
+    def h_button_grid(s, indent, il):
+        m = _RE_BUTTON_GRID.match(s)
+        if m:
+            lv, xv, yv, bw, bh, prefix = m.groups()
+            labels = emitter._arrays.get(lv, [])
+            xs     = emitter._arrays.get(xv, [])
+            ys     = emitter._arrays.get(yv, [])
+            for i, lbl in enumerate(labels):
+                hname = f"{prefix}_{i}"
+                if hname not in emitter.handlers:
+                    emitter.add_handler(hname, [])
+                il += [f'ldstr "{escape_il(lbl)}"',
+                       f'ldc.i4 {xs[i]}', f'ldc.i4 {ys[i]}', f'ldc.i4 {bw}', f'ldc.i4 {bh}',
+                       *_action_il(A, hname),
+                       'call void [NovaUI]NovaUI::button(string, int32, int32, int32, int32, class [mscorlib]System.Action)']
+            return True
+
+    # on_button
+    def h_on_button(s, indent, il):
+        m = _RE_ON_BUTTON.match(s)
+        if m:
+            prefix, bidx = m.groups()
+            hname = f"{prefix}_{bidx}"
+            inner = compile_block(indent+1)
+            emitter.add_handler(hname, inner)
+            return True
+
+    # named_label
+    def h_named_label(s, indent, il):
+        m = _RE_NAMED_LABEL.match(s)
+        if m:
+            lid, txt, x, y, w, h = m.groups()
+            il += [f'ldstr "{escape_il(lid)}"', f'ldstr "{escape_il(txt)}"',
+                   f'ldc.i4 {x}', f'ldc.i4 {y}', f'ldc.i4 {w}', f'ldc.i4 {h}',
+                   f'call void {A}::_AddNamedLabel(string, string, int32, int32, int32, int32)']
+            return True
+
+    # set_label
+    def h_set_label(s, indent, il):
+        m = _RE_SET_LABEL.match(s)
+        if m:
+            lid, expr = m.group(1), m.group(2).strip()
+            il.append(f'ldstr "{escape_il(lid)}"')
+            t = parse(expr, il)
+            coerce_to_string(t, il)
+            il.append(f'call void {A}::_SetLabelText(string, string)')
+            return True
+
+    # label("name", expr) — 2-arg: create-or-update a named label at auto position
+    def h_label(s, indent, il):
+        m2 = _RE_LABEL_EXPR.match(s)
+        if m2 and not _RE_LABEL_POS.match(s):
+            lid, expr = m2.group(1), m2.group(2).strip()
+            # Register the label name as a field so we can track whether it exists.
+            # We always call _SetLabelTextByName; the first time this runs the label
+            # won't exist yet so we auto-create it at a sensible default position,
+            # then on subsequent calls we just update the text.
+            lfield = "_lbl_exists_" + escape_il(lid).replace('"','').replace(' ','_')
+            if lfield not in emitter.fields:
+                emitter.fields[lfield] = "int"
+                emitter.cctor += ['ldc.i4.0', f'stsfld int32 {A}::{lfield}']
+            auto_id = escape_il(lid)
+            # Emit: if not exists, create; then always set text
+            skip_create = emitter.ulabel("LC")
+            il += [f'ldsfld int32 {A}::{lfield}',
+                   f'brtrue.s {skip_create}',
+                   f'ldstr "{auto_id}"',
+                   f'ldstr ""',
+                   'ldc.i4 20', 'ldc.i4 60', 'ldc.i4 340', 'ldc.i4 24',
+                   f'call void {A}::_AddNamedLabel(string, string, int32, int32, int32, int32)',
+                   'ldc.i4.1', f'stsfld int32 {A}::{lfield}',
+                   f'{skip_create}:',
+                   f'ldstr "{auto_id}"']
+            t = parse(expr, il)
+            coerce_to_string(t, il)
+            il.append(f'call void {A}::_SetLabelText(string, string)')
+            return True
+
+        # label (3-arg or 5-arg, optional colour)
+        m3 = _RE_LABEL_3.match(s)
+        if m3:
+            txt, x, y, hexcol = m3.group(1), m3.group(2), m3.group(3), m3.group(4)
+            auto_id = escape_il(f"_lbl_{emitter.ulabel('L')}")
+            if hexcol:
+                il += [f'ldstr "{auto_id}"', f'ldstr "{escape_il(txt)}"',
+                       f'ldc.i4 {x}', f'ldc.i4 {y}', 'ldc.i4 200', 'ldc.i4 24',
+                       f'ldstr "{escape_il(hexcol)}"',
+                       'call int32 [NovaUI]NovaUI::label(string, int32, int32, int32, int32, string)',
+                       'call void [NovaUI]NovaUI::_RegisterLabelName(string, int32)']
+            else:
+                il += [f'ldstr "{auto_id}"', f'ldstr "{escape_il(txt)}"',
+                       f'ldc.i4 {x}', f'ldc.i4 {y}', 'ldc.i4 200', 'ldc.i4 24',
+                       f'call void {A}::_AddNamedLabel(string, string, int32, int32, int32, int32)']
+            return True
+        m5 = _RE_LABEL_5.match(s)
+        if m5:
+            txt, x, y, w, h, hexcol = m5.groups()
+            auto_id = escape_il(f"_lbl_{emitter.ulabel('L')}")
+            if hexcol:
+                il += [f'ldstr "{auto_id}"', f'ldstr "{escape_il(txt)}"',
+                       f'ldc.i4 {x}', f'ldc.i4 {y}', f'ldc.i4 {w}', f'ldc.i4 {h}',
+                       f'ldstr "{escape_il(hexcol)}"',
+                       'call int32 [NovaUI]NovaUI::label(string, int32, int32, int32, int32, string)',
+                       'call void [NovaUI]NovaUI::_RegisterLabelName(string, int32)']
+            else:
+                il += [f'ldstr "{auto_id}"', f'ldstr "{escape_il(txt)}"',
                        f'ldc.i4 {x}', f'ldc.i4 {y}', f'ldc.i4 {w}', f'ldc.i4 {h}',
                        f'call void {A}::_AddNamedLabel(string, string, int32, int32, int32, int32)']
-                idx += 1; continue
-
-            # set_label
-            m = re.match(r'^set_label\s*\(\s*"([^"]+)"\s*,\s*(.+)\s*\)$', s)
-            if m:
-                lid, expr = m.group(1), m.group(2).strip()
-                il.append(f'ldstr "{escape_il(lid)}"')
-                t = parse(expr, il)
-                coerce_to_string(t, il)
-                il.append(f'call void {A}::_SetLabelText(string, string)')
-                idx += 1; continue
-
-            # label("name", expr) — 2-arg: create-or-update a named label at auto position
-            m2 = re.match(r'^label\s*\(\s*"([^"]+)"\s*,\s*(.+)\s*\)$', s)
-            if m2 and not re.match(r'^label\s*\(\s*"[^"]+"\s*,\s*\d+', s):
-                lid, expr = m2.group(1), m2.group(2).strip()
-                # Register the label name as a field so we can track whether it exists.
-                # We always call _SetLabelTextByName; the first time this runs the label
-                # won't exist yet so we auto-create it at a sensible default position,
-                # then on subsequent calls we just update the text.
-                lfield = "_lbl_exists_" + escape_il(lid).replace('"','').replace(' ','_')
-                if lfield not in emitter.fields:
-                    emitter.fields[lfield] = "int"
-                    emitter.cctor += ['ldc.i4.0', f'stsfld int32 {A}::{lfield}']
-                auto_id = escape_il(lid)
-                # Emit: if not exists, create; then always set text
-                skip_create = emitter.ulabel("LC")
-                il += [f'ldsfld int32 {A}::{lfield}',
-                       f'brtrue.s {skip_create}',
-                       f'ldstr "{auto_id}"',
-                       f'ldstr ""',
-                       'ldc.i4 20', 'ldc.i4 60', 'ldc.i4 340', 'ldc.i4 24',
-                       f'call void {A}::_AddNamedLabel(string, string, int32, int32, int32, int32)',
-                       'ldc.i4.1', f'stsfld int32 {A}::{lfield}',
-                       f'{skip_create}:',
-                       f'ldstr "{auto_id}"']
+            return True
+
+    # txtbox("label", "varname") { ... }  or  txtbox("label") { ... }
+    # Creates a text input box. The variable named by varname (or the
+    # second arg) is automatically populated with the box value so that
+    # code inside the block can read it as a normal Nova variable.
+    # ask() inside the block is rewritten to call get_textbox(id).
+    def h_txtbox(s, indent, il):
+        m = _RE_TXTBOX.match(s)
+        if m:
+            emitter.has_novaui = True
+            lbl     = m.group(1)
+            varname = m.group(2) if m.group(2) else None
+            tx, ty, tw = m.group(3), m.group(4), m.group(5)
+            has_coords = tx is not None
+            tb_id_field = emitter.ulabel("_tbid").replace("_tbid", "_tb_id")
+            if tb_id_field not in emitter.fields:
+                emitter.fields[tb_id_field] = "int"
+                emitter.cctor += ['ldc.i4.0', f'stsfld int32 {A}::{tb_id_field}']
+            if varname and varname not in emitter.fields:
+                emitter.fields[varname] = "string"
+                emitter.cctor += ['ldstr ""', f'stsfld string {A}::{varname}']
+            inner = compile_block(indent+1)
+            prefix = []
+            if varname:
+                prefix += [f'ldsfld int32 {A}::{tb_id_field}',
+                           f'call string [NovaUI]NovaUI::get_textbox(int32)',
+                           f'stsfld string {A}::{varname}']
+            hname = f"TB_{handler_counter[0]}"; handler_counter[0] += 1
+            emitter.add_handler(hname, prefix + inner)
+            if has_coords:
+                il += [f'ldstr "{escape_il(lbl)}"',
+                       f'ldc.i4 {tx}', f'ldc.i4 {ty}', f'ldc.i4 {tw}',
+                       *_action_il(A, hname),
+                       f'call int32 [NovaUI]NovaUI::textbox(string, int32, int32, int32, class [mscorlib]System.Action)',
+                       f'stsfld int32 {A}::{tb_id_field}']
+            else:
+                il += [f'ldstr "{escape_il(lbl)}"',
+                       *_action_il(A, hname),
+                       f'call int32 [NovaUI]NovaUI::textbox(string, class [mscorlib]System.Action)',
+                       f'stsfld int32 {A}::{tb_id_field}']
+            return True
+
+    # ask(prompt) as a statement: result = ask("...")
+    # When used as NAME = ask("prompt") it is handled by generic assignment below.
+    # Standalone ask() just discards the result.
+    def h_ask(s, indent, il):
+        m = _RE_ASK.match(s)
+        if m:
+            prompt_expr = m.group(1).strip()
+            if prompt_expr:
+                t = parse(prompt_expr, il); coerce_to_string(t, il)
+            else:
+                il.append('ldstr ""')
+            il.append(f'call string {A}::_ConsoleAsk(string)')
+            il.append('pop')   # discard result
+            return True
+
+    # mem_write("name", expr) as statement
+    def h_mem_write(s, indent, il):
+        m = _RE_MEM_WRITE.match(s)
+        if m:
+            seg, expr = m.group(1), m.group(2).strip()
+            il.append(f'ldstr "{escape_il(seg)}"')
+            t = parse(expr, il); coerce_to_string(t, il)
+            il.append(f'call void {A}::_MemWrite(string, string)')
+            return True
+
+    # clicked / clicked() (block opener).  Only the bare keyword counts, so
+    # variables such as clickedCount = 1 compile as plain assignments.
+    def h_clicked(s, indent, il):
+        if _RE_CLICKED.match(s):
+            inner = compile_block(indent+1)
+            il += inner; return True
+
+    # when
+    def h_when(s, indent, il):
+        m = _RE_WHEN.match(s)
+        if m:
+            end_l  = emitter.ulabel("ENDIF")
+            else_l = emitter.ulabel("ELSE")
+            parse(m.group(1).strip(), il)
+            il.append(f'brfalse {else_l}')
+            body = compile_block(indent+1)
+            il += body + [f'br {end_l}', f'{else_l}:']
+            while src.head is not None:
+                mww = _RE_WHENWISE.match(src.head[1])
+                if not mww: break
+                src.advance()
+                else_l2 = emitter.ulabel("ELSE")
+                parse(mww.group(1).strip(), il)
+                il.append(f'brfalse {else_l2}')
+                wbody = compile_block(indent+1)
+                il += wbody + [f'br {end_l}', f'{else_l2}:']
+            if src.head is not None and src.head[1] in ('otherwise', 'else'):
+                src.advance()
+                ob = compile_block(indent+1)
+                il += ob
+            il.append(f'{end_l}:'); return True
+
+    # while  — supports:
+    #   while(cond) {}
+    #   while (cond) {}
+    #   while(cond, ms) {}   — inside ui_window: becomes set_timer
+    #                        — outside ui_window: sleeps ms each iteration
+    def h_while(s, indent, il):
+        m = _RE_WHILE.match(s)
+        if m:
+            inner = m.group(1).strip()
+            delay_ms = None
+            comma_idx = inner.rfind(',')
+            if comma_idx != -1:
+                maybe_delay = inner[comma_idx+1:].strip()
+                if _RE_DIGITS.match(maybe_delay):
+                    delay_ms = maybe_delay
+                    inner = inner[:comma_idx].strip()
+
+            if delay_ms is None:
+                raise SyntaxError(
+                    f"while loop requires a delay: use while({inner}, ms), "
+                    f"e.g. while({inner}, 100). "
+                    f"A delay prevents the app from freezing."
+                )
+
+            if delay_ms and emitter.in_ui_window > 0:
+                # Inside a UI window — use WM_TIMER so the message pump stays alive
+                hname = f"T_{handler_counter[0]}"; handler_counter[0] += 1
+                body_il = compile_block(indent+1)
+                # The timer handler: check condition, if false kill timer, else run body
+                lp = emitter.ulabel("TC"); le = emitter.ulabel("TEND")
+                timer_body = []
+                parse(inner, timer_body)
+                timer_body += [f'brfalse {le}'] + body_il + [f'br {lp}', f'{lp}:', f'{le}:']
+                # Actually simpler: just run body unconditionally each tick,
+                # condition check left to user (they set running=0 to stop)
+                timer_body = list(body_il)
+                emitter.add_handler(hname, timer_body)
+                il += [f'ldc.i4 {delay_ms}',
+                       *_action_il(A, hname),
+                       'call void [NovaUI]NovaUI::set_timer(int32, class [mscorlib]System.Action)']
+                return True
+            else:
+                # Outside UI or no delay — classic blocking loop
+                lp = emitter.ulabel("LP"); le = emitter.ulabel("LPEND")
+                il.append(f'{lp}:')
+                parse(inner, il)
+                il.append(f'brfalse {le}')
+                body = compile_block(indent+1)
+                il += body
+                if delay_ms:
+                    il += [f'ldc.i4 {delay_ms}',
+                           'call void [mscorlib]System.Threading.Thread::Sleep(int32)']
+                il += [f'br {lp}', f'{le}:']; return True
+
+    # repeat N
+    def h_repeat(s, indent, il):
+        m = _RE_REPEAT.match(s)
+        if m:
+            ctr = emitter.ulabel("RC").replace("RC_", "_rc")
+            lp  = emitter.ulabel("RPL"); le = emitter.ulabel("RPE")
+            if ctr not in emitter.fields:
+                emitter.fields[ctr] = "int"
+                emitter.cctor += ['ldc.i4.0', f'stsfld int32 {A}::{ctr}']
+            parse(m.group(1).strip(), il)
+            il.append(f'stsfld int32 {A}::{ctr}')
+            il.append(f'{lp}:')
+            il += [f'ldsfld int32 {A}::{ctr}', f'brfalse {le}',
+                   f'ldsfld int32 {A}::{ctr}', 'ldc.i4.1', 'sub',
+                   f'stsfld int32 {A}::{ctr}']
+            body = compile_block(indent+1)
+            il += body + [f'br {lp}', f'{le}:']; return True
+
+    # break
+    def h_break(s, indent, il):
+        if s == 'break':
+            return True
+
+    # put(expr)
+    def h_put(s, indent, il):
+        m = _RE_PUT.match(s)
+        if m:
+            arg = m.group(1).strip()
+            if arg in emitter.fields and emitter.fields[arg] == "string[]":
+                il += ['ldstr ", "', f'ldsfld class [mscorlib]System.String[] {A}::{arg}',
+                       'call string [mscorlib]System.String::Join(string, string[])']
+            else:
+                t = parse(arg, il); coerce_to_string(t, il)
+            il.append('call void [mscorlib]System.Console::WriteLine(string)')
+            return True
+
+    # ui_message(expr)
+    def h_ui_message(s, indent, il):
+        m = _RE_UI_MESSAGE.match(s)
+        if m:
+            t = parse(m.group(1).strip(), il); coerce_to_string(t, il)
+            il.append(f'call void {A}::_ShowMessage(string)')
+            return True
+
+    # icon
+    def h_icon(s, indent, il):
+        m = _RE_ICON.match(s)
+        if m:
+            emitter.win32_icon = m.group(1)  # store for ilasm /win32icon flag
+            emitter.win32_icon_ext = os.path.splitext(m.group(1))[1].lower()
+            il += [f'ldstr "{escape_il(m.group(1))}"',
+                   f'call void {A}::_SetIcon(string)']
+            return True
+
+    # write_file
+    def h_write_file(s, indent, il):
+        m = _RE_WRITE_FILE.match(s)
+        if m:
+            il.append(f'ldstr "{escape_il(m.group(1))}"')
+            t = parse(m.group(2).strip(), il); coerce_to_string(t, il)
+            il.append('call void [mscorlib]System.IO.File::WriteAllText(string, string)')
+            return True
+
+    # App.Exit
+    def h_exit(s, indent, il):
+        if s in ('App.Exit', 'App.Exit()', 'ExitApp', 'ExitApp()'):
+            il.append(f'call void {A}::_ExitApp()')
+            return True
+
+    # pause / pause(ms)
+    def h_pause(s, indent, il):
+        if s in ('pause', 'pause()'):
+            il += ['call valuetype [mscorlib]System.ConsoleKeyInfo [mscorlib]System.Console::ReadKey()', 'pop']
+            return True
+        m = _RE_PAUSE.match(s)
+        if m:
+            pt = parse(m.group(1).strip(), il)
+            if pt == 'float': il.append('conv.i4')
+            il.append('call void [mscorlib]System.Threading.Thread::Sleep(int32)')
+            return True
+
+    # Fallbacks for lines no keyword handler took: X = read_file("path"),
+    # array element assignment and generic assignment.
+    def h_assign(s, indent, il):
+        m = _RE_READ_FILE_ASSIGN.match(s)
+        if m:
+            name, path = m.groups(); read_file_paths.add(path)
+            if name not in emitter.fields: emitter.fields[name] = "string"
+            il += [f'ldstr "{escape_il(path)}"',
+                   'call string [mscorlib]System.IO.File::ReadAllText(string)',
+                   f'stsfld string {A}::{name}']
+            return True
+        # array element assignment  NAME[expr] = expr
+        m = _RE_INDEX_ASSIGN.match(s)
+        if m:
+            aname, idx_expr, val_expr = m.group(1), m.group(2), m.group(3).strip()
+            if aname not in emitter.fields: emitter.fields[aname] = "string[]"
+            il.append(f'ldsfld class [mscorlib]System.String[] {A}::{aname}')
+            it = parse(idx_expr.strip(), il)
+            if it == "float": il.append('conv.i4')
+            vt = parse(val_expr, il); coerce_to_string(vt, il)
+            il.append('stelem.ref')
+            return True
+
+        # generic assignment  var = expr
+        m = _RE_ASSIGN.match(s)
+        if m:
+            name, expr = m.group(1), m.group(2).strip()
+            if _RE_FLOAT_LIT.match(expr):
+                if name not in emitter.fields:
+                    emitter.fields[name] = "float"
+                    emitter.cctor += ['ldc.r8 0.0', f'stsfld float64 {A}::{name}']
+                il += [f'ldc.r8 {expr}', f'stsfld float64 {A}::{name}']
+            elif expr.lstrip('-').isdigit():
+                ensure_int(name)
+                il += [f'ldc.i4 {expr}', f'stsfld int32 {A}::{name}']
+            else:
                 t = parse(expr, il)
-                coerce_to_string(t, il)
-                il.append(f'call void {A}::_SetLabelText(string, string)')
-                idx += 1; continue
-
-            # label (3-arg or 5-arg, optional colour)
-            m3 = re.match(r'^label\s*\(\s*"([^"]+)"\s*,\s*(\d+)\s*,\s*(\d+)\s*(?:,\s*(#[0-9A-Fa-f]{6}))?\s*\)$', s)
-            if m3:
-                txt, x, y, hexcol = m3.group(1), m3.group(2), m3.group(3), m3.group(4)
-                auto_id = escape_il("_lbl_" + emitter.ulabel('L'))
-                if hexcol:
-                    il += ['ldstr "' + auto_id + '"', 'ldstr "' + escape_il(txt) + '"',
-                           'ldc.i4 ' + x, 'ldc.i4 ' + y, 'ldc.i4 200', 'ldc.i4 24',
-                           'ldstr "' + escape_il(hexcol) + '"',
-                           'call int32 [NovaUI]NovaUI::label(string, int32, int32, int32, int32, string)',
-                           'call void [NovaUI]NovaUI::_RegisterLabelName(string, int32)']
-                else:
-                    il += ['ldstr "' + auto_id + '"', 'ldstr "' + escape_il(txt) + '"',
-                           'ldc.i4 ' + x, 'ldc.i4 ' + y, 'ldc.i4 200', 'ldc.i4 24',
-                           'call void ' + A + '::_AddNamedLabel(string, string, int32, int32, int32, int32)']
-                idx += 1; continue
-            m5 = re.match(r'^label\s*\(\s*"([^"]+)"\s*,\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*(?:,\s*(#[0-9A-Fa-f]{6}))?\s*\)$', s)
-            if m5:
-                txt, x, y, w, h, hexcol = m5.groups()
-                auto_id = escape_il("_lbl_" + emitter.ulabel('L'))
-                if hexcol:
-                    il += ['ldstr "' + auto_id + '"', 'ldstr "' + escape_il(txt) + '"',
-                           'ldc.i4 ' + x, 'ldc.i4 ' + y, 'ldc.i4 ' + w, 'ldc.i4 ' + h,
-                           'ldstr "' + escape_il(hexcol) + '"',
-                           'call int32 [NovaUI]NovaUI::label(string, int32, int32, int32, int32, string)',
-                           'call void [NovaUI]NovaUI::_RegisterLabelName(string, int32)']
-                else:
-                    il += ['ldstr "' + auto_id + '"', 'ldstr "' + escape_il(txt) + '"',
-                           'ldc.i4 ' + x, 'ldc.i4 ' + y, 'ldc.i4 ' + w, 'ldc.i4 ' + h,
-                           'call void ' + A + '::_AddNamedLabel(string, string, int32, int32, int32, int32)']
-                idx += 1; continue
-
-            # txtbox("label", "varname") { ... }  or  txtbox("label") { ... }
-            # Creates a text input box. The variable named by varname (or the
-            # second arg) is automatically populated with the box value so that
-            # code inside the block can read it as a normal Nova variable.
-            # ask() inside the block is rewritten to call get_textbox(id).
-            m = re.match(r'^txtbox\s*\(\s*"([^"]+)"\s*(?:,\s*"([^"]*)"\s*)?(?:,\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*)?\)$', s)
-            if m:
-                emitter.has_novaui = True
-                lbl     = m.group(1)
-                varname = m.group(2) if m.group(2) else None
-                tx, ty, tw = m.group(3), m.group(4), m.group(5)
-                has_coords = tx is not None
-                tb_id_field = emitter.ulabel("_tbid").replace("_tbid", "_tb_id")
-                if tb_id_field not in emitter.fields:
-                    emitter.fields[tb_id_field] = "int"
-                    emitter.cctor += ['ldc.i4.0', f'stsfld int32 {A}::{tb_id_field}']
-                if varname and varname not in emitter.fields:
-                    emitter.fields[varname] = "string"
-                    emitter.cctor += ['ldstr ""', f'stsfld string {A}::{varname}']
-                inner, idx = compile_block(idx+1, indent+1)
-                prefix = []
-                if varname:
-                    prefix += [f'ldsfld int32 {A}::{tb_id_field}',
-                               f'call string [NovaUI]NovaUI::get_textbox(int32)',
-                               f'stsfld string {A}::{varname}']
-                hname = "TB_" + str(handler_counter[0]); handler_counter[0] += 1
-                emitter.add_handler(hname, prefix + inner)
-                if has_coords:
-                    il += [f'ldstr "{escape_il(lbl)}"',
-                           f'ldc.i4 {tx}', f'ldc.i4 {ty}', f'ldc.i4 {tw}',
-                           'ldnull',
-                           f'ldftn void {A}::{hname}()',
-                           'newobj instance void [mscorlib]System.Action::.ctor(object, native int)',
-                           f'call int32 [NovaUI]NovaUI::textbox(string, int32, int32, int32, class [mscorlib]System.Action)',
-                           f'stsfld int32 {A}::{tb_id_field}']
-                else:
-                    il += [f'ldstr "{escape_il(lbl)}"',
-                           'ldnull',
-                           f'ldftn void {A}::{hname}()',
-                           'newobj instance void [mscorlib]System.Action::.ctor(object, native int)',
-                           f'call int32 [NovaUI]NovaUI::textbox(string, class [mscorlib]System.Action)',
-                           f'stsfld int32 {A}::{tb_id_field}']
-                continue
-
-            # ask(prompt) as a statement: result = ask("...")
-            # When used as NAME = ask("prompt") it is handled by generic assignment below.
-            # Standalone ask() just discards the result.
-            m = re.match(r'^ask\s*\(\s*(.*)\s*\)$', s)
-            if m:
-                prompt_expr = m.group(1).strip()
-                if prompt_expr:
-                    t = parse(prompt_expr, il); coerce_to_string(t, il)
-                else:
-                    il.append('ldstr ""')
-                il.append(f'call string {A}::_ConsoleAsk(string)')
-                il.append('pop')   # discard result
-                idx += 1; continue
-
-            # mem_write("name", expr) as statement
-            m = re.match(r'^mem_write\s*\(\s*"([^"]+)"\s*,\s*(.+)\s*\)$', s)
-            if m:
-                seg, expr = m.group(1), m.group(2).strip()
-                il.append(f'ldstr "{escape_il(seg)}"')
-                t = parse(expr, il); coerce_to_string(t, il)
-                il.append(f'call void {A}::_MemWrite(string, string)')
-                idx += 1; continue
-
-            # clicked / otherwise (block openers)
-            if s.startswith('clicked'):
-                inner, idx = compile_block(idx+1, indent+1)
-                il += inner; continue
-            if s in ('otherwise', 'else'):
-                break
-
-            # when
-            m = re.match(r'^when\s*\((.+)\)$', s)
-            if m:
-                end_l  = emitter.ulabel("ENDIF")
-                else_l = emitter.ulabel("ELSE")
-                parse(m.group(1).strip(), il)
-                il.append(f'brfalse {else_l}')
-                body, idx = compile_block(idx+1, indent+1)
-                il += body + [f'br {end_l}', f'{else_l}:']
-                while idx < len(lines):
-                    ws  = lines[idx].strip().rstrip('{').rstrip()
-                    mww = re.match(r'^(?:whenwise|ww)\s*\((.+)\)$', ws)
-                    if not mww: break
-                    idx += 1
-                    else_l2 = emitter.ulabel("ELSE")
-                    parse(mww.group(1).strip(), il)
-                    il.append(f'brfalse {else_l2}')
-                    wbody, idx = compile_block(idx, indent+1)
-                    il += wbody + [f'br {end_l}', f'{else_l2}:']
-                if idx < len(lines) and lines[idx].strip().rstrip('{').rstrip() in ('otherwise', 'else'):
-                    ob, idx = compile_block(idx+1, indent+1)
-                    il += ob
-                il.append(f'{end_l}:'); continue
-
-            # while  — supports:
-            #   while(cond) {}
-            #   while (cond) {}
-            #   while(cond, ms) {}   — inside ui_window: becomes set_timer
-            #                        — outside ui_window: sleeps ms each iteration
-            m = re.match(r'^while\s*\((.+)\)$', s)
-            if m:
-                inner = m.group(1).strip()
-                delay_ms = None
-                comma_idx = inner.rfind(',')
-                if comma_idx != -1:
-                    maybe_delay = inner[comma_idx+1:].strip()
-                    if re.match(r'^\d+$', maybe_delay):
-                        delay_ms = maybe_delay
-                        inner = inner[:comma_idx].strip()
-
-                if delay_ms is None:
-                    raise SyntaxError(
-                        f"while loop requires a delay: use while({inner}, ms), "
-                        f"e.g. while({inner}, 100). "
-                        f"A delay prevents the app from freezing."
-                    )
+                if name not in emitter.fields:
+                    emitter.fields[name] = t
+                    if   t == "int":   emitter.cctor += ['ldc.i4.0',   f'stsfld int32   {A}::{name}']
+                    elif t == "float": emitter.cctor += ['ldc.r8 0.0', f'stsfld float64 {A}::{name}']
+                    else:              emitter.cctor += ['ldstr ""',    f'stsfld string  {A}::{name}']
+                elif emitter.fields[name] != t:
+                    # Type mismatch: field was pre-declared as a different type.
+                    # Coerce the expression result to match the declared field type.
+                    declared = emitter.fields[name]
+                    if declared == "string":
+                        # Convert int/float result to string before storing
+                        il += _TO_STRING_IL.get(t, ())
+                        t = "string"
+                    elif declared == "int" and t == "float":
+                        il.append("conv.i4")
+                        t = "int"
+                    elif declared == "float" and t == "int":
+                        il.append("conv.r8")
+                        t = "float"
+                store(name, t, il)
+            return True
+
+    # Statement handlers keyed by the line's leading word.  Each takes the
+    # statement (already consumed from src; block handlers read their body
+    # from src themselves) and returns True, or None when the line doesn't
+    # have the form it handles (it then falls back to h_assign).
+    handlers = {
+        'use': h_use,                 'have': h_have,
+        'page': h_page,               'set_page': h_set_page,
+        'colors': h_colors,           'colours': h_colors,
+        'ui_window': h_ui_window,     'button': h_button,
+        'button_grid': h_button_grid, 'on_button': h_on_button,
+        'named_label': h_named_label, 'set_label': h_set_label,
+        'label': h_label,             'txtbox': h_txtbox,
+        'ask': h_ask,                 'mem_write': h_mem_write,
+        'clicked': h_clicked,         'when': h_when,
+        'while': h_while,             'repeat': h_repeat,
+        'break': h_break,             'put': h_put,
+        'ui_message': h_ui_message,   'icon': h_icon,
+        'write_file': h_write_file,   'App': h_exit,
+        'ExitApp': h_exit,            'pause': h_pause,
+    }
+
+    def compile_block(min_indent):
+        il = []
+        while src.head is not None:
+            indent, s, _, kw = src.head
+            if indent < min_indent: break
+            if s in ('otherwise', 'else'): break    # ends the enclosing when body
+            src.advance()
 
-                if delay_ms and emitter.in_ui_window > 0:
-                    # Inside a UI window — use WM_TIMER so the message pump stays alive
-                    hname = "T_" + str(handler_counter[0]); handler_counter[0] += 1
-                    body_il, idx = compile_block(idx+1, indent+1)
-                    # The timer handler: check condition, if false kill timer, else run body
-                    lp = emitter.ulabel("TC"); le = emitter.ulabel("TEND")
-                    timer_body = []
-                    parse(inner, timer_body)
-                    timer_body += [f'brfalse {le}'] + body_il + [f'br {lp}', f'{lp}:', f'{le}:']
-                    # Actually simpler: just run body unconditionally each tick,
-                    # condition check left to user (they set running=0 to stop)
-                    timer_body = list(body_il)
-                    emitter.add_handler(hname, timer_body)
-                    il += [f'ldc.i4 {delay_ms}',
-                           'ldnull',
-                           f'ldftn void {A}::{hname}()',
-                           'newobj instance void [mscorlib]System.Action::.ctor(object, native int)',
-                           'call void [NovaUI]NovaUI::set_timer(int32, class [mscorlib]System.Action)']
-                    continue
-                else:
-                    # Outside UI or no delay — classic blocking loop
-                    lp = emitter.ulabel("LP"); le = emitter.ulabel("LPEND")
-                    il.append(f'{lp}:')
-                    parse(inner, il)
-                    il.append(f'brfalse {le}')
-                    body, idx = compile_block(idx+1, indent+1)
-                    il += body
-                    if delay_ms:
-                        il += [f'ldc.i4 {delay_ms}',
-                               'call void [mscorlib]System.Threading.Thread::Sleep(int32)']
-                    il += [f'br {lp}', f'{le}:']; continue
-
-            # repeat N
-            m = re.match(r'^repeat\s+(.+)$', s)
-            if m:
-                ctr = emitter.ulabel("RC").replace("RC_", "_rc")
-                lp  = emitter.ulabel("RPL"); le = emitter.ulabel("RPE")
-                if ctr not in emitter.fields:
-                    emitter.fields[ctr] = "int"
-                    emitter.cctor += ['ldc.i4.0', f'stsfld int32 {A}::{ctr}']
-                parse(m.group(1).strip(), il)
-                il.append(f'stsfld int32 {A}::{ctr}')
-                il.append(f'{lp}:')
-                il += [f'ldsfld int32 {A}::{ctr}', f'brfalse {le}',
-                       f'ldsfld int32 {A}::{ctr}', 'ldc.i4.1', 'sub',
-                       f'stsfld int32 {A}::{ctr}']
-                body, idx = compile_block(idx+1, indent+1)
-                il += body + [f'br {lp}', f'{le}:']; continue
-
-            # break
-            if s == 'break':
-                idx += 1; continue
-
-            # put(expr)
-            m = re.match(r'^put\s*\(\s*(.+)\s*\)$', s)
-            if m:
-                arg = m.group(1).strip()
-                if arg in emitter.fields and emitter.fields[arg] == "string[]":
-                    il += ['ldstr ", "', f'ldsfld class [mscorlib]System.String[] {A}::{arg}',
-                           'call string [mscorlib]System.String::Join(string, string[])']
-                else:
-                    t = parse(arg, il); coerce_to_string(t, il)
-                il.append('call void [mscorlib]System.Console::WriteLine(string)')
-                idx += 1; continue
-
-            # ui_message(expr)
-            m = re.match(r'^ui_message\s*\(\s*(.+)\s*\)$', s)
-            if m:
-                t = parse(m.group(1).strip(), il); coerce_to_string(t, il)
-                il.append(f'call void {A}::_ShowMessage(string)')
-                idx += 1; continue
-
-            # icon
-            m = re.match(r'^icon\s*\(\s*"([^"]+)"\s*\)$', s)
-            if m:
-                emitter.win32_icon = m.group(1)  # store for ilasm /win32icon flag
-                il += [f'ldstr "{escape_il(m.group(1))}"',
-                       f'call void {A}::_SetIcon(string)']
-                idx += 1; continue
-
-            # write_file / read_file
-            m = re.match(r'^write_file\s*\(\s*"([^"]+)"\s*,\s*(.+)\s*\)$', s)
-            if m:
-                il.append(f'ldstr "{escape_il(m.group(1))}"')
-                t = parse(m.group(2).strip(), il); coerce_to_string(t, il)
-                il.append('call void [mscorlib]System.IO.File::WriteAllText(string, string)')
-                idx += 1; continue
-
-            m = re.match(r'^(\w+)\s*=\s*read_file\s*\(\s*"([^"]+)"\s*\)$', s)
-            if m:
-                name, path = m.groups(); read_file_paths.add(path)
-                if name not in emitter.fields: emitter.fields[name] = "string"
-                il += [f'ldstr "{escape_il(path)}"',
-                       'call string [mscorlib]System.IO.File::ReadAllText(string)',
-                       f'stsfld string {A}::{name}']
-                idx += 1; continue
-
-            # App.Exit / pause
-            if s in ('App.Exit', 'App.Exit()', 'ExitApp', 'ExitApp()'):
-                il.append(f'call void {A}::_ExitApp()')
-                idx += 1; continue
-            if s in ('pause', 'pause()'):
-                il += ['call valuetype [mscorlib]System.ConsoleKeyInfo [mscorlib]System.Console::ReadKey()', 'pop']
-                idx += 1; continue
-            m = re.match(r'^pause\s*\((.+)\)$', s)
-            if m:
-                pt = parse(m.group(1).strip(), il)
-                if pt == 'float': il.append('conv.i4')
-                il.append('call void [mscorlib]System.Threading.Thread::Sleep(int32)')
-                idx += 1; continue
-
-            # array element assignment  NAME[expr] = expr
-            m = re.match(r'^([A-Za-z_]\w*)\s*\[(.+?)\]\s*=\s*(.+)$', s)
-            if m:
-                aname, idx_expr, val_expr = m.group(1), m.group(2), m.group(3).strip()
-                if aname not in emitter.fields: emitter.fields[aname] = "string[]"
-                il.append(f'ldsfld class [mscorlib]System.String[] {A}::{aname}')
-                it = parse(idx_expr.strip(), il)
-                if it == "float": il.append('conv.i4')
-                vt = parse(val_expr, il); coerce_to_string(vt, il)
-                il.append('stelem.ref')
-                idx += 1; continue
-
-            # generic assignment  var = expr
-            m = re.match(r'^(\w+)\s*=\s*(.+)$', s)
-            if m:
-                name, expr = m.group(1), m.group(2).strip()
-                if re.match(r'^-?\d+\.\d+$', expr):
-                    if name not in emitter.fields:
-                        emitter.fields[name] = "float"
-                        emitter.cctor += ['ldc.r8 0.0', f'stsfld float64 {A}::{name}']
-                    il += [f'ldc.r8 {expr}', f'stsfld float64 {A}::{name}']
-                elif expr.lstrip('-').isdigit():
-                    ensure_int(name)
-                    il += [f'ldc.i4 {expr}', f'stsfld int32 {A}::{name}']
-                else:
-                    t = parse(expr, il)
-                    if name not in emitter.fields:
-                        emitter.fields[name] = t
-                        if   t == "int":   emitter.cctor += ['ldc.i4.0',   f'stsfld int32   {A}::{name}']
-                        elif t == "float": emitter.cctor += ['ldc.r8 0.0', f'stsfld float64 {A}::{name}']
-                        else:              emitter.cctor += ['ldstr ""',    f'stsfld string  {A}::{name}']
-                    elif emitter.fields[name] != t:
-                        # Type mismatch: field was pre-declared as a different type.
-                        # Coerce the expression result to match the declared field type.
-                        declared = emitter.fields[name]
-                        if declared == "string":
-                            # Convert int/float result to string before storing
-                            if t == "int":
-                                il += ["box [mscorlib]System.Int32",
-                                       "callvirt instance string [mscorlib]System.Object::ToString()"]
-                            elif t == "float":
-                                il += ["box [mscorlib]System.Double",
-                                       "callvirt instance string [mscorlib]System.Object::ToString()"]
-                            t = "string"
-                        elif declared == "int" and t == "float":
-                            il.append("conv.i4")
-                            t = "int"
-                        elif declared == "float" and t == "int":
-                            il.append("conv.r8")
-                            t = "float"
-                    store(name, t, il)
-                idx += 1; continue
-
-            idx += 1   # unrecognised - skip
-
-        return il, idx
-
-    main_il, _ = compile_block(0, 0)
+            h = handlers.get(kw)
+            if not (h and h(s, indent, il)):
+                h_assign(s, indent, il)             # unrecognised - skipped
+        return il
+
+    main_il = compile_block(0)
     emitter._main_lines = main_il
     return emitter, read_file_paths
 
 
+# --- build (translate + ilasm) ------------------------------------------------
+
+_DLL_LOCK = threading.Lock()
+_BUILT      = collections.OrderedDict()   # output path -> (sha1 of IL + ilasm command, output mtime_ns)
+_BUILT_MAX  = 32
+_BUILT_LOCK = threading.Lock()
+
+_FILE_XLAT      = collections.OrderedDict()   # (path, mtime_ns, size, name) -> translation
+_FILE_XLAT_MAX  = 32
+_FILE_XLAT_LOCK = threading.Lock()
+
+def _translate_file(src_path, assembly_name):
+    """
+    translate_nova_to_il() for a source file on disk.  Keyed on the
+    file's path, mtime and size, so a file that hasn't been touched since
+    its last compile isn't even read again.  The newest 32 are kept.
+    """
+    st  = os.stat(src_path)
+    key = (os.path.abspath(src_path), st.st_mtime_ns, st.st_size, assembly_name)
+    with _FILE_XLAT_LOCK:
+        hit = _FILE_XLAT.get(key)
+        if hit is not None:
+            _FILE_XLAT.move_to_end(key)
+            return hit
+    src = pathlib.Path(src_path).read_text(encoding="utf-8")
+    hit = translate_nova_to_il(src, assembly_name)
+    with _FILE_XLAT_LOCK:
+        _FILE_XLAT[key] = hit
+        if len(_FILE_XLAT) > _FILE_XLAT_MAX: _FILE_XLAT.popitem(last=False)
+    return hit
+
+def _write_if_changed(path, text):
+    """
+    Write text to path unless the file already holds exactly that text.
+    Leaving an identical .il alone saves a write (and a virus-scanner pass
+    on Windows) on every rebuild of an unchanged program.
+    """
+    try:
+        if pathlib.Path(path).read_text(encoding="utf-8") == text: return False
+    except (OSError, UnicodeDecodeError):
+        pass
+    with open(path, "w", encoding="utf-8") as f: f.write(text)
+    return True
+
+def _compile_one(src_path, out_base, compile_type, ilasm, script_dir):
+    """
+    Translate one .nova file and assemble it with ilasm.
+    Runs on a worker thread, so it touches no Tk state: returns
+    (il_text, log_lines) and the GUI shows them once the job is done.
+    il_text is None if translation failed.
+    """
+    log = []
+    try:
+        emitter, read_paths = _translate_file(src_path, out_base)
+    except SyntaxError as e:
+        log.append(f"Syntax Error: {e}\n")
+        log.append("Compilation aborted.\n")
+        return None, log
+    except Exception as e:
+        log.append(f"Error: {e}\n")
+        log.append("Compilation aborted.\n")
+        return None, log
+    il_text    = emitter.get_il(emitter._main_lines)
+    out_folder = os.path.dirname(os.path.abspath(src_path))
+    out_stem   = os.path.join(out_folder, out_base)
+    il_path    = out_stem + ".il"
+    cwd        = os.getcwd()
+    search_dirs = (out_folder, script_dir, cwd)     # where runtime dlls are looked up
+    _write_if_changed(il_path, il_text)
+    for p in read_paths:
+        tp = os.path.join(out_folder, p)
+        if not os.path.exists(tp):
+            if os.path.dirname(p): os.makedirs(os.path.join(out_folder, os.path.dirname(p)), exist_ok=True)
+            open(tp, "w").close()
+    with _DLL_LOCK:     # parallel jobs may copy the same runtime dll
+        if emitter.has_novaui:
+            candidates = [os.path.join(folder, name)
+                          for name in ("NovaUI.dll", "novaui.dll") for folder in search_dirs]
+            dll_src = next((p for p in candidates if os.path.isfile(p)), None)
+            dst = os.path.join(out_folder, "NovaUI.dll")
+            if dll_src and os.path.abspath(dll_src) != dst:
+                try: shutil.copy2(dll_src, dst); log.append("Copied NovaUI.dll\n")
+                except Exception as e: log.append("Warning: " + str(e) + "\n")
+            elif not dll_src:
+                log.append("Warning: NovaUI.dll not found.\n")
+        if emitter.has_novapc:
+            candidates = [os.path.join(folder, name)
+                          for name in ("novapc.dll", "NovaPc.dll", "NOVAPC.DLL") for folder in search_dirs]
+            dll_src = next((p for p in candidates if os.path.isfile(p)), None)
+            dst = os.path.join(out_folder, "novapc.dll")
+            if dll_src and os.path.abspath(dll_src) != dst:
+                try: shutil.copy2(dll_src, dst); log.append("Copied novapc.dll\n")
+                except Exception as e: log.append("Warning: " + str(e) + "\n")
+            elif not dll_src:
+                log.append("Warning: novapc.dll not found — compile novapc.cs first.\n")
+    ilasm = ilasm or find_ilasm_path()
+    if not ilasm:
+        log.append("Error: ilasm.exe not found.\n"); return il_text, log
+    ext      = ".exe" if compile_type == "exe" else ".dll"
+    out_file = out_stem + ext
+    cmd      = [ilasm, il_path, f"/{compile_type}", f"/output={out_file}"]
+    stamp    = hashlib.sha1(il_text.encode("utf-8"))
+
+    # Embed .ico into the exe using a hand-written .res so File Explorer shows it.
+    # No rc.exe or Windows SDK needed — we write the binary .res ourselves.
+    if emitter.win32_icon and compile_type == "exe" and emitter.win32_icon_ext != ".ico":
+        log.append(f"Warning: only .ico files can be embedded ({emitter.win32_icon})"
+                   " — window icon only.\n")
+    elif emitter.win32_icon and compile_type == "exe":
+        ico_path = emitter.win32_icon
+        if not os.path.isabs(ico_path):
+            for base in (script_dir, out_folder, cwd):
+                candidate = os.path.join(base, ico_path)
+                if os.path.isfile(candidate):
+                    ico_path = os.path.abspath(candidate); break
+        if os.path.isfile(ico_path):
+            try:
+                res_path = out_stem + ".res"
+                _write_icon_res(ico_path, res_path)
+                cmd.append(f"/resource={res_path}")
+                stamp.update(f"{ico_path}|{os.path.getmtime(ico_path)}".encode("utf-8"))
+                log.append("Embedded icon into exe.\n")
+            except Exception as e:
+                log.append(f"Warning: icon embed failed ({e}) — window icon only.\n")
+        else:
+            log.append(f"Warning: icon file not found: {ico_path}\n")
+    # ilasm start-up dominates a rebuild, so skip it when this exact IL and
+    # command line already produced the output and nobody touched it since.
+    stamp.update("\0".join(cmd).encode("utf-8"))
+    stamp = stamp.digest()
+    try: out_mtime = os.stat(out_file).st_mtime_ns
+    except OSError: out_mtime = None
+    with _BUILT_LOCK:
+        built = _BUILT.get(out_file)
+        if built is not None: _BUILT.move_to_end(out_file)
+    if out_mtime is not None and built == (stamp, out_mtime):
+        log.append(f"Up to date: {out_file}\n")
+        log.append("Done.\n")
+        return il_text, log
+    log.append(f"Running: {' '.join(cmd)}\n")
+    try:
+        p = subprocess.run(cmd, capture_output=True, text=True, cwd=out_folder)
+        log.append(p.stdout + p.stderr + "\n")
+        if p.returncode == 0 and os.path.exists(out_file):
+            built = (stamp, os.stat(out_file).st_mtime_ns)
+            with _BUILT_LOCK:
+                _BUILT[out_file] = built
+                _BUILT.move_to_end(out_file)
+                if len(_BUILT) > _BUILT_MAX: _BUILT.popitem(last=False)
+    except Exception as ex: log.append(f"Error: {ex}\n")
+    log.append("Done.\n")
+    return il_text, log
+
+
 # --- compiler GUI -------------------------------------------------------------
 
+_NOVA_NAME = re.compile(r'\.nova\Z', re.IGNORECASE)   # case-insensitive, like Windows
+_LOG_MAX_LINES = 2000                                   # older log lines are dropped
+
+_PALETTE = {"bg": "#1e1e1e", "fg": "#ffffff", "button": "#333333",
+            "field": "#2d2d2d", "select": "#444444"}
+# (option-database pattern, palette key) pairs installed on the root window.
+_WIDGET_OPTIONS = (
+    ("*Toplevel.background",      "bg"),
+    ("*Frame.background",         "bg"),
+    ("*Label.background",         "bg"),     ("*Label.foreground",       "fg"),
+    ("*Button.background",        "button"), ("*Button.foreground",      "fg"),
+    ("*Entry.background",         "field"),  ("*Entry.foreground",       "fg"),
+    ("*Entry.insertBackground",   "fg"),
+    ("*Listbox.background",       "field"),  ("*Listbox.foreground",     "fg"),
+    ("*Listbox.selectBackground", "select"),
+    ("*Radiobutton.background",   "bg"),     ("*Radiobutton.foreground", "fg"),
+    ("*Radiobutton.selectColor",  "bg"),
+    ("*Text.background",          "bg"),     ("*Text.foreground",        "fg"),
+)
+
 class NovaCompilerApp:
     def __init__(self, root):
         self.root = root
@@ -1542,150 +1911,187 @@ class NovaCompilerApp:
         self.src_dir      = tk.StringVar(value=os.getcwd())
         self.out_name     = tk.StringVar(value="NovaProgram")
         self.ilasm_path   = tk.StringVar(value=find_ilasm_path() or "")
+        self._cached_ilasm = None   # resolved assembler; reset when the path field changes
+        self.ilasm_path.trace_add("write", self._forget_ilasm)
         self.compile_type = tk.StringVar(value="exe")
         self.last_il      = ""
-        self.BG = "#1e1e1e"; self.FG = "#ffffff"
-        self.BTN = "#333333"; self.EBG = "#2d2d2d"
-        root.configure(bg=self.BG)
+        self._il_job      = None    # Future whose IL becomes last_il (first selected file)
+        self._listing     = None    # ((folder, mtime_ns), sorted .nova names)
+        self._pool        = None    # ThreadPoolExecutor, created on first compile
+        self._log_pending = []      # text waiting for the next _flush_log
+        self._log_after   = None    # id of the scheduled _flush_log, if any
+        self._building    = False   # a compile's jobs are still running
+        # Colours go into Tk's option database once; every widget created
+        # afterwards picks them up instead of being passed bg=/fg= itself.
+        for pattern, colour in _WIDGET_OPTIONS:
+            root.option_add(pattern, _PALETTE[colour])
+        root.configure(bg=_PALETTE["bg"])
         self._build_ui(); self._refresh()
+        root.protocol("WM_DELETE_WINDOW", self._close)
+
+    def _close(self):
+        # Builds still queued are dropped.  One that is already running
+        # finishes on its worker thread; the window doesn't wait for it.
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+        self.root.destroy()
 
     def _build_ui(self):
-        top = tk.Frame(self.root, padx=6, pady=6, bg=self.BG); top.pack(fill="x")
-        tk.Label(top, text="Source Folder:", bg=self.BG, fg=self.FG).pack(side="left")
-        tk.Entry(top, textvariable=self.src_dir, width=60, bg=self.EBG, fg=self.FG,
-                 insertbackground="white").pack(side="left", padx=5)
-        tk.Button(top, text="Browse", command=self._browse, bg=self.BTN, fg=self.FG).pack(side="left")
-
-        mid  = tk.Frame(self.root, padx=8, bg=self.BG); mid.pack(fill="both", expand=True)
-        left = tk.Frame(mid, bg=self.BG); left.pack(side="left", fill="both", expand=True)
-        tk.Label(left, text=".nova files:", bg=self.BG, fg=self.FG).pack(anchor="w")
-        self.listbox = tk.Listbox(left, bg=self.EBG, fg=self.FG, selectbackground="#444")
+        top = tk.Frame(self.root, padx=6, pady=6); top.pack(fill="x")
+        tk.Label(top, text="Source Folder:").pack(side="left")
+        tk.Entry(top, textvariable=self.src_dir, width=60).pack(side="left", padx=5)
+        tk.Button(top, text="Browse", command=self._browse).pack(side="left")
+
+        mid  = tk.Frame(self.root, padx=8); mid.pack(fill="both", expand=True)
+        left = tk.Frame(mid); left.pack(side="left", fill="both", expand=True)
+        tk.Label(left, text=".nova files:").pack(anchor="w")
+        self.file_list = tk.Variable(value=())
+        self.listbox = tk.Listbox(left, selectmode=tk.EXTENDED, listvariable=self.file_list)
         self.listbox.pack(fill="both", expand=True)
-        tk.Button(left, text="Refresh", command=self._refresh, bg=self.BTN, fg=self.FG).pack(fill="x", pady=6)
+        tk.Button(left, text="Refresh", command=lambda: self._refresh(force=True)).pack(fill="x", pady=6)
 
-        right = tk.Frame(mid, width=320, padx=8, bg=self.BG); right.pack(side="right", fill="y")
-        tk.Label(right, text="Compile Settings", font=("Arial", 10, "bold"), bg=self.BG, fg=self.FG).pack(anchor="w")
+        right = tk.Frame(mid, width=320, padx=8); right.pack(side="right", fill="y")
+        tk.Label(right, text="Compile Settings", font=("Arial", 10, "bold")).pack(anchor="w")
         for txt, val in [("Standalone App (.exe)", "exe"), ("Library (.dll)", "dll")]:
-            tk.Radiobutton(right, text=txt, variable=self.compile_type, value=val,
-                           bg=self.BG, fg=self.FG, selectcolor=self.BG).pack(anchor="w")
+            tk.Radiobutton(right, text=txt, variable=self.compile_type, value=val).pack(anchor="w")
         for lbl, var in [("\nOutput Base Name:", self.out_name), ("\nilasm path (optional):", self.ilasm_path)]:
-            tk.Label(right, text=lbl, bg=self.BG, fg=self.FG).pack(anchor="w")
-            tk.Entry(right, textvariable=var, bg=self.EBG, fg=self.FG,
-                     insertbackground="white").pack(fill="x", pady=5)
-        tk.Button(right, text="Compile .nova Files", command=self._compile,
-                  height=2, bg="#0ba300", fg="white").pack(fill="x", pady=10)
-        tk.Button(right, text="Open Output Folder", command=self._open_out,
-                  bg=self.BTN, fg=self.FG).pack(fill="x", pady=2)
-        tk.Button(right, text="Show Generated IL", command=self._show_il,
-                  bg=self.BTN, fg=self.FG).pack(fill="x", pady=2)
+            tk.Label(right, text=lbl).pack(anchor="w")
+            tk.Entry(right, textvariable=var).pack(fill="x", pady=5)
+        self.compile_btn = tk.Button(right, text="Compile .nova Files", command=self._compile,
+                                     height=2, bg="#0ba300", fg="white")
+        self.compile_btn.pack(fill="x", pady=10)
+        tk.Button(right, text="Open Output Folder", command=self._open_out).pack(fill="x", pady=2)
+        tk.Button(right, text="Show Generated IL", command=self._show_il).pack(fill="x", pady=2)
         self.log = scrolledtext.ScrolledText(self.root, height=18, bg="black", fg="#00ff00")
         self.log.pack(fill="both", padx=8, pady=8)
 
+    def _log(self, text):
+        # Queue text for the log; everything queued within 50 ms goes in
+        # with one insert, so a burst of messages costs a single redraw.
+        self._log_pending.append(text)
+        if self._log_after is None:
+            self._log_after = self.root.after(50, self._flush_log)
+
+    def _flush_log(self):
+        self._log_after = None
+        if not self._log_pending: return
+        self.log.insert(tk.END, "".join(self._log_pending))
+        self._log_pending.clear()
+        # Keep only the newest _LOG_MAX_LINES lines so the widget (and each
+        # repaint of it) stays bounded during long batch builds.
+        lines = int(self.log.index("end-1c").split(".")[0])
+        if lines > _LOG_MAX_LINES:
+            self.log.delete("1.0", f"{lines - _LOG_MAX_LINES + 1}.0")
+        self.log.see(tk.END)
+
     def _browse(self):
         d = filedialog.askdirectory(initialdir=self.src_dir.get())
         if d: self.src_dir.set(d); self._refresh()
 
-    def _refresh(self):
-        self.listbox.delete(0, tk.END)
+    def _refresh(self, force=False):
+        # The listbox mirrors self.file_list, so refilling it is a single
+        # variable write (one Tcl call) however many files there are.
+        names = ()
         try:
-            for f in os.listdir(self.src_dir.get()):
-                if f.lower().endswith(".nova"): self.listbox.insert(tk.END, f)
-        except Exception as e: self.log.insert(tk.END, f"Error: {e}\n")
+            # Adding, removing or renaming a file bumps the folder's mtime,
+            # so an unchanged (folder, mtime) pair means the listing is too.
+            # The Refresh button passes force=True and always rescans, in
+            # case the filesystem's mtime is too coarse to notice a change.
+            folder = os.path.abspath(self.src_dir.get())
+            key    = (folder, os.stat(folder).st_mtime_ns)
+            if force or self._listing is None or self._listing[0] != key:
+                is_nova = _NOVA_NAME.search
+                with os.scandir(folder) as it:
+                    names = sorted(e.name for e in it if is_nova(e.name) and e.is_file())
+                self._listing = (key, tuple(names))
+            names = self._listing[1]
+        except Exception as e: self._log(f"Error: {e}\n")
+        self.file_list.set(names)
 
     def _show_il(self):
         if not self.last_il: return
-        top = tk.Toplevel(self.root); top.title("Generated IL"); top.configure(bg=self.BG)
-        txt = scrolledtext.ScrolledText(top, bg=self.BG, fg=self.FG); txt.pack(fill="both", expand=True)
+        top = tk.Toplevel(self.root); top.title("Generated IL")
+        txt = scrolledtext.ScrolledText(top); txt.pack(fill="both", expand=True)
         txt.insert("1.0", self.last_il)
 
     def _open_out(self):
         try: os.startfile(self.src_dir.get())
-        except Exception as e: self.log.insert(tk.END, f"Error: {e}\n")
+        except Exception as e: self._log(f"Error: {e}\n")
+
+    def _forget_ilasm(self, *_):
+        self._cached_ilasm = None
+
+    def _resolve_ilasm(self):
+        # Resolved once and reused across compiles; re-resolved if the path
+        # field is edited or the cached assembler has disappeared.
+        p = self._cached_ilasm
+        if p and os.path.isfile(p): return p
+        p = self.ilasm_path.get().strip()
+        if not p:
+            find_ilasm_path.cache_clear()   # a previous hit may be gone
+            p = find_ilasm_path() or ""
+        self._cached_ilasm = p or None
+        return p
 
     def _compile(self):
+        if self._building: return       # one build at a time: jobs share output files
         sel = self.listbox.curselection()
         if not sel:
             messagebox.showwarning("No file selected", "Please select a .nova file."); return
-        fname = self.listbox.get(sel[0])
-        with open(os.path.join(self.src_dir.get(), fname), encoding="utf-8") as f: src = f.read()
-        out_base = self.out_name.get().strip() or "NovaProgram"
-        self.log.delete("1.0", tk.END)
-        try:
-            emitter, read_paths = translate_nova_to_il(src, out_base)
-        except SyntaxError as e:
-            self.log.insert(tk.END, f"Syntax Error: {e}\n")
-            self.log.insert(tk.END, "Compilation aborted.\n")
-            self.log.see(tk.END)
-            return
-        except Exception as e:
-            self.log.insert(tk.END, f"Error: {e}\n")
-            self.log.insert(tk.END, "Compilation aborted.\n")
-            self.log.see(tk.END)
-            return
-        self.last_il = emitter.get_il(emitter._main_lines)
+        names      = [self.listbox.get(i) for i in sel]
         out_folder = os.path.abspath(self.src_dir.get())
-        il_path = os.path.join(out_folder, out_base + ".il")
-        with open(il_path, "w", encoding="utf-8") as f: f.write(self.last_il)
-        for p in read_paths:
-            tp = os.path.join(out_folder, p)
-            if not os.path.exists(tp):
-                if os.path.dirname(p): os.makedirs(os.path.join(out_folder, os.path.dirname(p)), exist_ok=True)
-                open(tp, "w").close()
-        if emitter.has_novaui:
-            candidates = []
-            for name in ("NovaUI.dll", "novaui.dll"):
-                for folder in (out_folder, self.script_dir, os.getcwd()):
-                    candidates.append(os.path.join(folder, name))
-            dll_src = next((p for p in candidates if os.path.isfile(p)), None)
-            dst = os.path.join(out_folder, "NovaUI.dll")
-            if dll_src and os.path.abspath(dll_src) != os.path.abspath(dst):
-                try: shutil.copy2(dll_src, dst); self.log.insert(tk.END, "Copied NovaUI.dll\n")
-                except Exception as e: self.log.insert(tk.END, "Warning: " + str(e) + "\n")
-            elif not dll_src:
-                self.log.insert(tk.END, "Warning: NovaUI.dll not found.\n")
-        if emitter.has_novapc:
-            candidates = []
-            for name in ("novapc.dll", "NovaPc.dll", "NOVAPC.DLL"):
-                for folder in (out_folder, self.script_dir, os.getcwd()):
-                    candidates.append(os.path.join(folder, name))
-            dll_src = next((p for p in candidates if os.path.isfile(p)), None)
-            dst = os.path.join(out_folder, "novapc.dll")
-            if dll_src and os.path.abspath(dll_src) != os.path.abspath(dst):
-                try: shutil.copy2(dll_src, dst); self.log.insert(tk.END, "Copied novapc.dll\n")
-                except Exception as e: self.log.insert(tk.END, "Warning: " + str(e) + "\n")
-            elif not dll_src:
-                self.log.insert(tk.END, "Warning: novapc.dll not found — compile novapc.cs first.\n")
-        ilasm = self.ilasm_path.get() or find_ilasm_path()
-        if not ilasm: self.log.insert(tk.END, "Error: ilasm.exe not found.\n"); return
-        ext      = ".exe" if self.compile_type.get() == "exe" else ".dll"
-        out_file = os.path.join(out_folder, out_base + ext)
-        cmd      = [ilasm, il_path, f"/{self.compile_type.get()}", f"/output={out_file}"]
-
-        # Embed .ico into the exe using a hand-written .res so File Explorer shows it.
-        # No rc.exe or Windows SDK needed — we write the binary .res ourselves.
-        if emitter.win32_icon and self.compile_type.get() == "exe":
-            ico_path = emitter.win32_icon
-            if not os.path.isabs(ico_path):
-                for base in (self.script_dir, out_folder, os.getcwd()):
-                    candidate = os.path.join(base, ico_path)
-                    if os.path.isfile(candidate):
-                        ico_path = os.path.abspath(candidate); break
-            if os.path.isfile(ico_path):
-                try:
-                    res_path = os.path.join(out_folder, out_base + ".res")
-                    _write_icon_res(ico_path, res_path)
-                    cmd.append(f"/resource={res_path}")
-                    self.log.insert(tk.END, "Embedded icon into exe.\n")
-                except Exception as e:
-                    self.log.insert(tk.END, f"Warning: icon embed failed ({e}) — window icon only.\n")
-            else:
-                self.log.insert(tk.END, f"Warning: icon file not found: {ico_path}\n")
-        self.log.insert(tk.END, f"Running: {' '.join(cmd)}\n")
-        try:
-            p = subprocess.run(cmd, capture_output=True, text=True, cwd=out_folder)
-            self.log.insert(tk.END, p.stdout + p.stderr + "\n")
-        except Exception as ex: self.log.insert(tk.END, f"Error: {ex}\n")
-        self.log.insert(tk.END, "Done.\n"); self.log.see(tk.END)
+        base       = self.out_name.get().strip() or "NovaProgram"
+        ctype      = self.compile_type.get()
+        ilasm      = self._resolve_ilasm()
+        self._log_pending.clear()
+        self.log.delete("1.0", tk.END)
+        # Tk widgets and variables are read here, on the main thread; the
+        # workers only get plain values.  With several files selected each
+        # one is named after its own stem so the outputs don't collide.
+        if self._pool is None:
+            # One pool for the life of the window; each job mostly waits on
+            # ilasm, so a thread per core keeps that many assemblers busy.
+            self._pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 4,
+                                            thread_name_prefix="nova-build")
+        # Two selected files with the same stem (a.nova and a.NOVA) would
+        # write the same .il/.res and run ilasm on the same exe at once, so
+        # only the first of them is built.
+        jobs, stems = [], {}
+        for fname in names:
+            out_base = base if len(names) == 1 else os.path.splitext(fname)[0]
+            key      = os.path.normcase(os.path.join(out_folder, out_base))
+            if key in stems:
+                self._log(f"Skipped {fname}: {stems[key]} already builds {out_base}.\n"); continue
+            stems[key] = fname
+            fut = self._pool.submit(_compile_one, os.path.join(out_folder, fname),
+                                    out_base, ctype, ilasm, self.script_dir)
+            jobs.append((fname, fut))
+        self.last_il = ""
+        self._il_job = jobs[0][1] if jobs else None
+        self._building = True
+        self.compile_btn.config(state="disabled")
+        self._poll_compiles(jobs, len(names) > 1)
+
+    def _poll_compiles(self, jobs, multi):
+        # Everything that finished since the last tick goes into the log
+        # as one chunk.
+        pending, buf = [], []
+        for fname, fut in jobs:
+            if not fut.done():
+                pending.append((fname, fut)); continue
+            if multi: buf.append(f"== {fname} ==\n")
+            try:
+                il, lines = fut.result()
+            except Exception as e:
+                il, lines = None, [f"Error: {e}\n"]
+            if fut is self._il_job: self.last_il = il or ""
+            buf += lines
+        if buf: self._log("".join(buf))
+        if pending:
+            self.root.after(50, self._poll_compiles, pending, multi)
+        else:
+            self._building = False
+            self.compile_btn.config(state="normal")
 
 
 if __name__ == "__main__":
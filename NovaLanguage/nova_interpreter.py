@@ -47,7 +47,8 @@ STATEMENTS
   inline blocks        when(x){put(1)}otherwise{put(0)}  on one line
 """
 
-import re, sys, os, random as _random
+import collections, hashlib, re, sys, os, time, random as _random
+from dataclasses import dataclass
 _rng = _random.Random()  # single persistent instance — never re-seeded
 
 
@@ -70,17 +71,72 @@ TOKEN_SPEC = [
     ('COMMENT',   r'//[^\n]*'),
     ('MISMATCH',  r'.'),
 ]
-_TOK_RE = re.compile('|'.join(f'(?P<{k}>{v})' for k, v in TOKEN_SPEC))
+# TOKEN_SPEC documents the token grammar; tokenize() below is a hand-written
+# scanner for it (no regex engine in the hot loop).  Keep the two in sync.
+
+_ID_START  = frozenset('ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz_')
+_SPACE     = frozenset(' \t\r\n')
+_TWO_CHAR  = frozenset(('==', '!=', '<=', '>='))
+_ONE_CHAR  = {
+    '+': 'OP', '-': 'OP', '*': 'OP', '/': 'OP', '%': 'OP', '<': 'OP', '>': 'OP',
+    '=': 'EQ',
+    '{': 'LBRACE', '}': 'RBRACE',
+    '(': 'LPAREN', ')': 'RPAREN',
+    '[': 'LBRACK', ']': 'RBRACK',
+    ',': 'COMMA',
+    ';': 'SEMI',
+}
 
 def tokenize(code):
+    # Globals and bound methods are pulled into locals up front: the scan
+    # loop runs once per character, and a local load is much cheaper than a
+    # global or attribute lookup in CPython.
     toks = []
-    for m in _TOK_RE.finditer(code):
-        k, v = m.lastgroup, m.group()
-        if k in ('SKIP', 'COMMENT', 'MISMATCH'): continue
-        if   k == 'FLOAT':  v = float(v)
-        elif k == 'INT':    v = int(v)
-        elif k == 'STRING': v = v[1:-1]
-        toks.append({'type': k, 'val': v})
+    emit = toks.append
+    find = code.find
+    space, id_start, two_char, one_char = _SPACE, _ID_START, _TWO_CHAR, _ONE_CHAR
+    i, n = 0, len(code)
+    while i < n:
+        c = code[i]
+        if c in space:
+            i += 1
+            while i < n and code[i] in space: i += 1
+            continue
+        if c == '"':
+            j = find('"', i + 1)
+            if j < 0: i += 1; continue          # unterminated quote: skip it
+            emit(('STRING', code[i+1:j])); i = j + 1
+            continue
+        if c.isdecimal():
+            j = i + 1
+            while j < n and code[j].isdecimal(): j += 1
+            if j + 1 < n and code[j] == '.' and code[j+1].isdecimal():
+                j += 2
+                while j < n and code[j].isdecimal(): j += 1
+                emit(('FLOAT', float(code[i:j])))
+            else:
+                emit(('INT', int(code[i:j])))
+            i = j
+            continue
+        if c in id_start:
+            j = i + 1
+            while j < n:
+                d = code[j]
+                if not (d.isalnum() or d == '_'): break
+                j += 1
+            emit(('ID', code[i:j])); i = j
+            continue
+        two = code[i:i+2]
+        if two == '//':
+            j = find('\n', i)
+            i = n if j < 0 else j
+            continue
+        if two in two_char:
+            emit(('OP', two)); i += 2
+            continue
+        k = one_char.get(c)
+        if k: emit((k, c))
+        i += 1                                  # anything else is skipped
     return toks
 
 
@@ -216,302 +272,409 @@ def _mem_read(name):
         return f"ERROR:{e}"
 
 
-# --- interpreter --------------------------------------------------------------
-
-class BreakSignal(Exception): pass
-
-class NovaInterpreter:
-    def __init__(self, tokens, output_fn=None, ask_fn=None):
-        self.tokens = tokens
-        self.pos    = 0
-        self.vars   = {}
-        self._out   = output_fn or (lambda s: print(s))
-        self._ask   = ask_fn    or (lambda p: input(p))
+# --- values & operators -------------------------------------------------------
+
+def _display(v):
+    if isinstance(v, float) and v == int(v): return str(int(v))
+    if isinstance(v, list): return "[" + ", ".join(_display(x) for x in v) + "]"
+    return str(v)
+
+def _op_add(l, r):
+    if isinstance(l, str) or isinstance(r, str):
+        return _display(l) + _display(r)
+    return l + r
+
+def _op_div(l, r):
+    if r == 0: return 0
+    res = l / r; return int(res) if res == int(res) else res
+
+def _op_mod(l, r):
+    return int(l) % int(r)
+
+
+# --- syntax tree --------------------------------------------------------------
+# parse() turns the token list into these nodes once; the code generator
+# below turns them into Python.  Loop bodies are parsed a single time.
+
+@dataclass
+class Num:
+    val: object
+
+@dataclass
+class Str:
+    val: str
+
+@dataclass
+class Var:
+    name: str
+
+@dataclass
+class Index:                # arr[n]
+    name: str
+    index: object
+
+@dataclass
+class ArrayLit:             # ["a", "b"]  (only as the right side of have)
+    items: list
+
+@dataclass
+class Neg:
+    operand: object
+
+@dataclass
+class BinOp:
+    op: str
+    left: object
+    right: object
+
+@dataclass
+class Call:                 # built-in call; unknown names evaluate args -> 0
+    name: str
+    args: list
+
+@dataclass
+class RandRange:            # rand(lo - hi)
+    lo: int
+    hi: int
+
+@dataclass
+class Let:                  # have x = expr
+    name: str
+    expr: object
+
+@dataclass
+class Assign:               # x = expr
+    name: str
+    expr: object
+
+@dataclass
+class IndexAssign:          # x[n] = expr
+    name: str
+    index: object
+    expr: object
+
+@dataclass
+class Print:                # put(expr)
+    expr: object
+
+@dataclass
+class ExprStmt:
+    expr: object
+
+@dataclass
+class If:                   # when / whenwise* / otherwise
+    branches: list          # [(cond, body), ...]
+    else_: object           # body or None
+
+@dataclass
+class While:
+    cond: object
+    delay_ms: int
+    body: list
+
+@dataclass
+class Repeat:
+    count: object
+    body: list
+
+@dataclass
+class Break:
+    pass
+
+@dataclass
+class Pause:                # pause / pause() -> wait for Enter, pause(ms) -> sleep
+    ms: object
+
+@dataclass
+class WriteFile:
+    path: str
+    expr: object
+
+@dataclass
+class MemWrite:
+    seg: str
+    expr: object
+
+@dataclass
+class Label:                # label(name[, value, ...])
+    name: object
+    value: object
+    extra: list
+
+@dataclass
+class TxtBox:               # txtbox(label[, "var", ...]) { body }
+    label: object
+    varname: object
+    extra: list
+    body: list
+
+@dataclass
+class Colors:               # colors(preset) { key = value ... }
+    preset: object
+    assigns: list           # [(key, expr), ...]
+
+@dataclass
+class Fail:                 # unparsable statement or condition; raises when run
+    msg: str
+
+
+# --- parser -------------------------------------------------------------------
+
+_ONE_ARG = {'put', 'len', 'int', 'float', 'str', 'abs', 'type'}
+_TWO_ARG = {'max', 'min'}
+_NO_ARG  = {'cpu', 'ram', 'gpu', 'gpu_val', 'cpu_val', 'ram_used', 'ram_total', 'all_pc'}
+
+class NovaParser:
+    # Tokens are pulled from an iterator with a single lookahead slot (_cur);
+    # the parser never rewinds.  _pos counts the tokens consumed so far, so
+    # loops can tell whether a step made progress.
+
+    def __init__(self, tokens):
+        self._it  = iter(tokens)
+        self._cur = next(self._it, None)
+        self._pos = 0
 
     # -- token helpers ---------------------------------------------------------
 
-    def peek(self, off=0):
-        i = self.pos + off
-        return self.tokens[i] if i < len(self.tokens) else None
+    def peek(self):
+        return self._cur
 
     def eat(self, typ=None, val=None):
-        t = self.peek()
+        t = self._cur
         if t is None: raise SyntaxError("Unexpected end of input")
-        if typ and t['type'] != typ:
-            raise SyntaxError(f"Expected {typ}, got {t['type']} ({t['val']!r})")
-        if val is not None and t['val'] != val:
-            raise SyntaxError(f"Expected {val!r}, got {t['val']!r}")
-        self.pos += 1; return t
+        if typ and t[0] != typ:
+            raise SyntaxError(f"Expected {typ}, got {t[0]} ({t[1]!r})")
+        if val is not None and t[1] != val:
+            raise SyntaxError(f"Expected {val!r}, got {t[1]!r}")
+        self._cur = next(self._it, None); self._pos += 1; return t
 
     def match(self, typ=None, val=None):
-        t = self.peek()
+        t = self._cur
         if not t: return False
-        if typ and t['type'] != typ: return False
-        if val is not None and t['val'] != val: return False
+        if typ and t[0] != typ: return False
+        if val is not None and t[1] != val: return False
         return True
 
-    # -- runner ----------------------------------------------------------------
-
-    def run_all(self):
-        while self.pos < len(self.tokens):
-            self.statement()
+    def _advanced(self, start):
+        """Guard for argument loops: a token no expression can start with
+        would otherwise be re-read forever.  start is the _pos the step
+        began at."""
+        if self._pos == start:
+            t = self._cur
+            raise SyntaxError(f"Unexpected {t[0]} ({t[1]!r})")
+
+    # -- statements ------------------------------------------------------------
+
+    def parse(self):
+        # A statement that doesn't parse becomes a Fail node and ends this
+        # statement list, so the SyntaxError is raised only if the program
+        # actually gets there - as when statements were parsed as they ran.
+        stmts = []
+        while self._cur is not None:
+            start = self._pos
+            try:
+                s = self.statement()
+            except SyntaxError as e:
+                stmts.append(Fail(str(e))); break
+            if s is not None: stmts.append(s)
+            if self._pos == start: self.eat()       # stray token - skip it
+        return stmts
 
     def statement(self):
-        t = self.peek()
-        if not t or t['val'] == '}': return
+        t = self._cur
+        if not t or t[1] == '}': return None
+
+        if t[0] == 'SEMI': self.eat(); return None
 
-        if t['type'] == 'SEMI': self.eat(); return
+        if t[0] != 'ID':
+            return ExprStmt(self.expression())
+        kw = t[1]
 
         # orphaned chain keywords - skip safely
-        if t['type'] == 'ID' and t['val'] in ('whenwise', 'ww', 'otherwise', 'else'):
+        if kw in ('whenwise', 'ww', 'otherwise', 'else'):
             self.eat()
             if self.match('LPAREN'):
-                self.eat(); depth = 1
-                while self.pos < len(self.tokens) and depth:
-                    k = self.tokens[self.pos]['type']
-                    if k == 'LPAREN': depth += 1
-                    elif k == 'RPAREN': depth -= 1
-                    self.pos += 1
-            if self.match('LBRACE'): self._block()
-            return
-
-        # colors/colours block — just run the body, color state is visual-only
-        if t['type'] == 'ID' and t['val'] in ('colors', 'colours'):
+                self.eat(); self._collect_until('RPAREN')
+                if self._cur is not None: self.eat()
+            if self.match('LBRACE'): self._block_tokens()
+            return None
+
+        # colors/colours block — color state is visual-only, keep key=value pairs
+        if kw in ('colors', 'colours'):
             self.eat(); self.eat('LPAREN')
             preset = None
             if not self.match('RPAREN'):
-                preset = self._display(self.expression())
+                preset = self.expression()
             self.eat('RPAREN')
-            body = self._block()
-            if preset:
-                self._out(f"[theme: {preset}]")
-            # parse body for key=value color assignments and store them
-            saved_tokens, saved_pos = self.tokens, self.pos
-            self.tokens, self.pos = body, 0
-            while self.pos < len(self.tokens):
-                ct = self.peek()
-                if not ct: break
-                if ct['type'] == 'ID' and self.pos + 2 < len(self.tokens):
-                    key = ct['val']
-                    if self.tokens[self.pos+1]['type'] == 'EQ':
-                        self.eat(); self.eat('EQ')
-                        val = self._display(self.expression())
-                        self.vars[f'_theme_{key}'] = val
-                    else:
-                        self.eat()
-                else:
-                    self.eat()
-            self.tokens, self.pos = saved_tokens, saved_pos
-            return
-
-        if t['type'] == 'ID' and t['val'] == 'have':
+            sub = NovaParser(self._block_tokens())
+            assigns = []
+            while sub._cur is not None:
+                ct = sub.eat()
+                if ct[0] == 'ID' and sub.match('EQ'):
+                    sub.eat()
+                    if sub._cur is not None:
+                        assigns.append((ct[1], sub.expression()))
+            return Colors(preset, assigns)
+
+        if kw == 'have':
             self.eat()
-            name = self.eat('ID')['val']
+            name = self.eat('ID')[1]
             self.eat('EQ')
-            self.vars[name] = self._rhs()
-            return
+            return Let(name, self._rhs())
 
-        if t['type'] == 'ID' and t['val'] == 'break':
-            self.eat(); raise BreakSignal()
+        if kw == 'break':
+            self.eat(); return Break()
 
-        if t['type'] == 'ID' and t['val'] == 'pause':
+        if kw == 'pause':
             self.eat()
+            ms = None
             if self.match('LPAREN'):
                 self.eat('LPAREN')
-                if self.match('RPAREN'):
-                    # pause() with no arg — wait for Enter
-                    self.eat('RPAREN')
-                    input()
-                else:
-                    import time as _time
+                if not self.match('RPAREN'):
                     ms = self.expression()
-                    self.eat('RPAREN')
-                    _time.sleep(float(ms) / 1000.0)
-            else:
-                input()
-            return
+                self.eat('RPAREN')
+            return Pause(ms)
 
-        if t['type'] == 'ID' and t['val'] == 'put':
+        if kw == 'put':
             self.eat(); self.eat('LPAREN')
-            self._out(self._display(self.expression()))
-            self.eat('RPAREN'); return
+            e = self.expression()
+            self.eat('RPAREN'); return Print(e)
 
-        if t['type'] == 'ID' and t['val'] == 'write_file':
+        if kw == 'write_file':
             self.eat(); self.eat('LPAREN')
-            path = self.eat('STRING')['val']; self.eat('COMMA')
-            val  = self.expression();         self.eat('RPAREN')
-            with open(path, 'w', encoding='utf-8') as f: f.write(str(val))
-            return
+            path = self.eat('STRING')[1]; self.eat('COMMA')
+            e = self.expression();        self.eat('RPAREN')
+            return WriteFile(path, e)
 
-        if t['type'] == 'ID' and t['val'] == 'mem_write':
+        if kw == 'mem_write':
             self.eat(); self.eat('LPAREN')
-            seg = self.eat('STRING')['val']; self.eat('COMMA')
-            val = self.expression(); self.eat('RPAREN')
-            try: _mem_write(seg, self._display(val))
-            except Exception as e: self._out(f"[mem_write error] {e}")
-            return
+            seg = self.eat('STRING')[1]; self.eat('COMMA')
+            e = self.expression(); self.eat('RPAREN')
+            return MemWrite(seg, e)
 
-        if t['type'] == 'ID' and t['val'] == 'label':
+        if kw == 'label':
             self.eat(); self.eat('LPAREN')
             name = self.expression()
+            value, extra = None, []
             if self.match('COMMA'):
                 self.eat()
-                val = self._display(self.expression())
+                value = self.expression()
                 while self.match('COMMA'):
-                    self.eat(); self.expression()
-                self.eat('RPAREN')
-                key = f"_label_{name}"
-                self.vars[key] = val
-                self._out(f"[{name}] {val}")
-            else:
-                self.eat('RPAREN')
-            return
+                    self.eat(); extra.append(self.expression())
+            self.eat('RPAREN')
+            return Label(name, value, extra)
 
-        if t['type'] == 'ID' and t['val'] == 'txtbox':
+        if kw == 'txtbox':
             self.eat(); self.eat('LPAREN')
-            lbl     = self._display(self.expression())
-            varname = None
+            lbl     = self.expression()
+            varname = None; extra = []
             if self.match('COMMA'):
                 self.eat()
-                nxt = self.peek()
-                if nxt and nxt['type'] == 'STRING':
-                    varname = self._display(self.expression())
+                if self.match('STRING'):
+                    varname = self.expression()
             while self.match('COMMA'):
-                self.eat(); self.expression()
+                self.eat(); extra.append(self.expression())
             self.eat('RPAREN')
-            body = self._block()
-            if lbl:
-                print(lbl)
-            if varname:
-                self.vars[varname] = self._ask(lbl + ": " if lbl else "")
-            self._exec_block(body)
-            return
-
-        if t['type'] == 'ID' and t['val'] == 'when':
+            return TxtBox(lbl, varname, extra, self._block())
+
+        if kw == 'when':
             self.eat(); self.eat('LPAREN')
-            cond_toks = self._collect_until('RPAREN'); self.eat('RPAREN')
-            body = self._block()
-            branches = [(cond_toks, body)]
-            while self.match('ID') and self.peek()['val'] in ('whenwise', 'ww'):
+            cond = self._sub_expression(self._collect_until('RPAREN')); self.eat('RPAREN')
+            branches = [(cond, self._block())]
+            while self.match('ID') and self.peek()[1] in ('whenwise', 'ww'):
                 self.eat(); self.eat('LPAREN')
-                ec = self._collect_until('RPAREN'); self.eat('RPAREN')
-                eb = self._block()
-                branches.append((ec, eb))
+                ec = self._sub_expression(self._collect_until('RPAREN')); self.eat('RPAREN')
+                branches.append((ec, self._block()))
             other = None
-            if self.match('ID') and self.peek()['val'] in ('otherwise', 'else'):
+            if self.match('ID') and self.peek()[1] in ('otherwise', 'else'):
                 self.eat(); other = self._block()
-            for bc, bb in branches:
-                if self._truthy(self._eval_tokens(bc)):
-                    self._exec_block(bb); return
-            if other is not None: self._exec_block(other)
-            return
+            return If(branches, other)
 
-        if t['type'] == 'ID' and t['val'] == 'while':
+        if kw == 'while':
             self.eat(); self.eat('LPAREN')
             cond_toks = self._collect_until('RPAREN')
-            # check for optional delay: while(cond, ms)
+            # while(cond, ms): the delay is a trailing comma + integer
             delay_ms = None
-            # scan cond_toks for a trailing comma + integer
             for i in range(len(cond_toks) - 1, -1, -1):
-                if cond_toks[i]['type'] == 'COMMA':
+                if cond_toks[i][0] == 'COMMA':
                     maybe = cond_toks[i+1:]
-                    if len(maybe) == 1 and maybe[0]['type'] == 'INT':
-                        delay_ms = int(maybe[0]['val'])
+                    if len(maybe) == 1 and maybe[0][0] == 'INT':
+                        delay_ms = int(maybe[0][1])
                         cond_toks = cond_toks[:i]
                     break
             if delay_ms is None:
-                cond_str = ' '.join(str(tok['val']) for tok in cond_toks)
+                cond_str = ' '.join(str(tok[1]) for tok in cond_toks)
                 raise SyntaxError(
                     f"while loop requires a delay: use while({cond_str}, ms) — "
                     f"e.g. while({cond_str}, 100). "
                     f"A delay prevents the app from freezing."
                 )
             self.eat('RPAREN')
-            body = self._block()
-            import time as _time
-            while True:
-                if not self._truthy(self._eval_tokens(cond_toks)): break
-                try: self._exec_block(body)
-                except BreakSignal: break
-                if delay_ms is not None:
-                    _time.sleep(delay_ms / 1000.0)
-            return
-
-        if t['type'] == 'ID' and t['val'] == 'repeat':
+            return While(self._sub_expression(cond_toks), delay_ms, self._block())
+
+        if kw == 'repeat':
+            self.eat()
+            n = self.expression()
+            return Repeat(n, self._block())
+
+        self.eat()
+        if self.match('LBRACK'):
+            self.eat()
+            idx = self.expression(); self.eat('RBRACK'); self.eat('EQ')
+            return IndexAssign(kw, idx, self.expression())
+        if self.match('EQ'):
             self.eat()
-            n    = int(self._coerce_int(self.expression()))
-            body = self._block()
-            for _ in range(n):
-                try: self._exec_block(body)
-                except BreakSignal: break
-            return
-
-        if t['type'] == 'ID':
-            name = t['val']
-            nxt  = self.peek(1)
-            if nxt and nxt['type'] == 'LBRACK':
-                self.eat(); self.eat()
-                idx = self.expression(); self.eat('RBRACK'); self.eat('EQ')
-                val = self.expression()
-                arr = self.vars.get(name, [])
-                if isinstance(arr, list):
-                    i = int(self._coerce_int(idx))
-                    while len(arr) <= i: arr.append("")
-                    arr[i] = val; self.vars[name] = arr
-                return
-            if nxt and nxt['type'] == 'EQ':
-                self.eat(); self.eat()
-                self.vars[name] = self.expression(); return
-            self.expression(); return
-
-        self.expression()
+            return Assign(kw, self.expression())
+        return ExprStmt(self.expression(self._id_tail(kw)))
 
     # -- block helpers ---------------------------------------------------------
 
     def _rhs(self):
         if self.match('LBRACK'):
             self.eat(); items = []
-            while self.peek() and not self.match('RBRACK'):
+            while self._cur and not self.match('RBRACK'):
+                start = self._pos
                 items.append(self.expression())
+                self._advanced(start)
                 if self.match('COMMA'): self.eat()
-            self.eat('RBRACK'); return items
+            self.eat('RBRACK'); return ArrayLit(items)
         return self.expression()
 
-    _BLOCK_TERMINATORS = {'whenwise', 'ww', 'otherwise', 'else'}
+    def _block_tokens(self):
+        self.eat('LBRACE'); toks = []; depth = 1
+        while self._cur is not None:
+            t = self.eat()
+            if t[0] == 'LBRACE': depth += 1
+            elif t[0] == 'RBRACE':
+                depth -= 1
+                if not depth: break
+            toks.append(t)
+        return toks
 
     def _block(self):
-        self.eat('LBRACE'); start = self.pos; depth = 1
-        while self.pos < len(self.tokens) and depth:
-            k = self.tokens[self.pos]['type']
-            if k == 'LBRACE': depth += 1
-            elif k == 'RBRACE': depth -= 1
-            self.pos += 1
-        return self.tokens[start: self.pos - 1]
-
-    def _exec_block(self, toks):
-        saved_tokens, saved_pos = self.tokens, self.pos
-        self.tokens, self.pos = toks, 0
-        try: self.run_all()
-        finally: self.tokens, self.pos = saved_tokens, saved_pos
+        return NovaParser(self._block_tokens()).parse()
 
     def _collect_until(self, stop_type):
         toks = []; depth = 0
-        while self.pos < len(self.tokens):
-            t = self.tokens[self.pos]
-            if t['type'] == 'LPAREN': depth += 1
-            elif t['type'] == 'RPAREN':
+        while self._cur is not None:
+            t = self._cur
+            if t[0] == 'LPAREN': depth += 1
+            elif t[0] == 'RPAREN':
                 if depth == 0: break
                 depth -= 1
-            toks.append(t); self.pos += 1
+            toks.append(self.eat())
         return toks
 
-    def _eval_tokens(self, toks):
-        saved_tokens, saved_pos = self.tokens, self.pos
-        self.tokens, self.pos = toks, 0
-        try: return self.expression()
-        finally: self.tokens, self.pos = saved_tokens, saved_pos
+    def _sub_expression(self, toks):
+        # condition tokens are parsed on their own; anything after the first
+        # complete expression is ignored.  A condition that doesn't parse
+        # fails when it is tested, not before the program starts.
+        try:
+            return NovaParser(toks).expression()
+        except SyntaxError as e:
+            return Fail(str(e))
 
-    # -- expression parser -----------------------------------------------------
+    # -- expressions -----------------------------------------------------------
 
     _PREC = [
         {'==', '!=', '<', '>', '<=', '>='},
@@ -519,256 +682,582 @@ class NovaInterpreter:
         {'*', '/', '%'},
     ]
 
-    def expression(self):
-        return self._prec(0)
+    def expression(self, first=None):
+        """Parse an expression.  `first` is an operand the caller already
+        consumed (a statement that turned out not to be an assignment)."""
+        return self._prec(0, first)
 
-    def _prec(self, lvl):
-        if lvl >= len(self._PREC): return self._unary()
+    def _prec(self, lvl, first=None):
+        if lvl >= len(self._PREC): return first or self._unary()
         ops  = self._PREC[lvl]
-        left = self._prec(lvl + 1)
-        while self.match('OP') and self.peek()['val'] in ops:
-            op    = self.eat()['val']
-            right = self._prec(lvl + 1)
-            left  = self._op(op, left, right)
+        left = self._prec(lvl + 1, first)
+        t    = self._cur
+        while t and t[0] == 'OP' and t[1] in ops:
+            self._cur = next(self._it, None)    # eat() without the checks
+            self._pos += 1
+            left = BinOp(t[1], left, self._prec(lvl + 1))
+            t    = self._cur
         return left
 
     def _unary(self):
         if self.match('OP', '-'):
-            self.eat(); v = self._primary()
-            return -v if isinstance(v, (int, float)) else v
+            self.eat(); return Neg(self._primary())
         return self._primary()
 
     def _primary(self):
         t = self.peek()
-        if not t: return 0
+        if not t: return Num(0)
 
-        if t['type'] == 'LPAREN':
+        if t[0] == 'LPAREN':
             self.eat(); v = self.expression(); self.eat('RPAREN'); return v
-        if t['type'] == 'FLOAT':  self.eat(); return t['val']
-        if t['type'] == 'INT':    self.eat(); return t['val']
-        if t['type'] == 'STRING': self.eat(); return t['val']
+        if t[0] in ('FLOAT', 'INT'): self.eat(); return Num(t[1])
+        if t[0] == 'STRING':         self.eat(); return Str(t[1])
 
-        if t['type'] == 'ID':
-            name = t['val']; self.eat()
+        if t[0] == 'ID':
+            self.eat(); return self._id_tail(t[1])
 
-            if self.match('LPAREN'):
-                self.eat()
-                def _arg():   return self.expression()
-                def _arg2():  a = _arg(); self.eat('COMMA'); b = _arg(); return a, b
-                def _close(): self.eat('RPAREN')
-
-                if name == 'put':
-                    v = _arg(); _close(); self._out(self._display(v)); return v
-                if name == 'read_file':
-                    path = self.eat('STRING')['val']; _close()
-                    try:
-                        with open(path, encoding='utf-8') as f: return f.read()
-                    except Exception as e: return f"ERROR:{e}"
-                if name in ('ask', 'input'):
-                    prompt = '' if self.match('RPAREN') else self._display(_arg())
-                    _close(); return self._ask(prompt)
-                if name == 'mem_read':
-                    seg = self.eat('STRING')['val']; _close()
-                    return _mem_read(seg)
-                if name == 'mem_write':
-                    seg = self.eat('STRING')['val']; self.eat('COMMA')
-                    v = _arg(); _close()
-                    try: _mem_write(seg, self._display(v))
-                    except Exception as e: self._out(f"[mem_write error] {e}")
-                    return v
-                if name == 'len':
-                    v = _arg(); _close()
-                    return len(v) if isinstance(v, (str, list)) else 0
-                if name == 'int':
-                    v = _arg(); _close(); return self._coerce_int(v)
-                if name == 'float':
-                    v = _arg(); _close(); return self._coerce_float(v)
-                if name == 'str':
-                    v = _arg(); _close(); return self._display(v)
-                if name == 'abs':
-                    v = _arg(); _close()
-                    return abs(v) if isinstance(v, (int, float)) else v
-                if name == 'max':
-                    a, b = _arg2(); _close(); return max(a, b)
-                if name == 'cpu':
-                    _close()
-                    try:
-                        import psutil
-                        return 'CPU: {:.1f}%'.format(psutil.cpu_percent(interval=0.1))
-                    except ImportError:
-                        return 'CPU: N/A (pip install psutil)'
-                if name == 'ram':
-                    _close()
-                    try:
-                        import psutil
-                        m = psutil.virtual_memory()
-                        used  = m.used  / 1073741824
-                        total = m.total / 1073741824
-                        return 'RAM: {:.1f} GB / {:.1f} GB ({:.0f}%)'.format(used, total, m.percent)
-                    except ImportError:
-                        return 'RAM: N/A (pip install psutil)'
-                if name == 'gpu':
-                    _close()
-                    try:
-                        import subprocess, re as _re
-                        out = subprocess.check_output(
-                            ['nvidia-smi', '--query-gpu=utilization.gpu',
-                             '--format=csv,noheader,nounits'],
-                            stderr=subprocess.DEVNULL).decode().strip()
-                        return 'GPU: {}%'.format(out.split('\n')[0].strip())
-                    except Exception:
-                        return 'GPU: N/A'
-                if name == 'gpu_val':
-                    _close()
-                    try:
-                        import subprocess
-                        out = subprocess.check_output(
-                            ['nvidia-smi', '--query-gpu=utilization.gpu',
-                             '--format=csv,noheader,nounits'],
-                            stderr=subprocess.DEVNULL).decode().strip()
-                        return float(out.split('\n')[0].strip())
-                    except Exception:
-                        return -1.0
-                if name == 'cpu_val':
-                    _close()
-                    try:
-                        import psutil
-                        return float(psutil.cpu_percent(interval=0.1))
-                    except ImportError:
-                        return -1.0
-                if name == 'ram_used':
-                    _close()
-                    try:
-                        import psutil
-                        return psutil.virtual_memory().used / 1073741824
-                    except ImportError:
-                        return -1.0
-                if name == 'ram_total':
-                    _close()
-                    try:
-                        import psutil
-                        return psutil.virtual_memory().total / 1073741824
-                    except ImportError:
-                        return -1.0
-                if name == 'all_pc':
-                    _close()
-                    try:
-                        import psutil
-                        c = psutil.cpu_percent(interval=0.1)
-                        m = psutil.virtual_memory()
-                        used  = m.used  / 1073741824
-                        total = m.total / 1073741824
-                        cpu_s = 'CPU: {:.1f}%'.format(c)
-                        ram_s = 'RAM: {:.1f}/{:.1f} GB'.format(used, total)
-                        return '{} | {} | GPU: N/A'.format(cpu_s, ram_s)
-                    except ImportError:
-                        return 'N/A (pip install psutil)'
-                if name == 'rand':
-                    # Peek: is it range form rand(lo - hi)?
-                    # Tokens at current pos would be: INT/FLOAT, OP(-), INT/FLOAT, RPAREN
-                    saved = self.pos
-                    try:
-                        t1 = self.peek(0)
-                        t2 = self.peek(1)
-                        t3 = self.peek(2)
-                        t4 = self.peek(3)
-                        if (t1 and t1['type'] in ('INT','FLOAT') and
-                            t2 and t2['type'] == 'OP' and t2['val'] == '-' and
-                            t3 and t3['type'] in ('INT','FLOAT') and
-                            t4 and t4['type'] == 'RPAREN'):
-                            lo = int(self.eat()['val'])
-                            self.eat('OP', '-')
-                            hi = int(self.eat()['val'])
-                            _close()
-                            return _rng.randint(lo, hi)
-                    except Exception:
-                        self.pos = saved
-                    # pick-list form: rand(a, b, c, ...)
-                    choices = []
-                    while not self.match('RPAREN') and self.peek():
-                        choices.append(_arg())
-                        if self.match('COMMA'): self.eat()
-                    _close()
-                    return _rng.choice(choices) if choices else 0
-                if name == 'min':
-                    a, b = _arg2(); _close(); return min(a, b)
-                if name == 'type':
-                    v = _arg(); _close()
-                    if isinstance(v, list):  return "array"
-                    if isinstance(v, float): return "float"
-                    if isinstance(v, int):   return "int"
-                    return "string"
-                if name == 'write_file':
-                    path = self.eat('STRING')['val']; self.eat('COMMA')
-                    v = _arg(); _close()
-                    with open(path, 'w', encoding='utf-8') as f: f.write(str(v))
-                    return v
-                while not self.match('RPAREN') and self.peek():
-                    _arg()
-                    if self.match('COMMA'): self.eat()
-                _close(); return 0
-
-            if self.match('LBRACK'):
-                self.eat(); idx = self.expression(); self.eat('RBRACK')
-                arr = self.vars.get(name, [])
-                if isinstance(arr, list):
-                    i = int(self._coerce_int(idx))
-                    return arr[i] if 0 <= i < len(arr) else ""
-                return ""
-
-            return self.vars.get(name, 0)
-
-        return 0
-
-    # -- operators -------------------------------------------------------------
-
-    def _op(self, op, l, r):
-        if op == '+' and (isinstance(l, str) or isinstance(r, str)):
-            return self._display(l) + self._display(r)
-        if op == '+':  return l + r
-        if op == '-':  return l - r
-        if op == '*':  return l * r
-        if op == '/':
-            if r == 0: return 0
-            res = l / r; return int(res) if res == int(res) else res
-        if op == '%':  return int(l) % int(r)
-        if op == '==': return int(l == r)
-        if op == '!=': return int(l != r)
-        if op == '<':  return int(l <  r)
-        if op == '>':  return int(l >  r)
-        if op == '<=': return int(l <= r)
-        if op == '>=': return int(l >= r)
-        return 0
-
-    # -- helpers ---------------------------------------------------------------
-
-    def _truthy(self, v):
-        if isinstance(v, (int, float)): return v != 0
-        if isinstance(v, str):          return v != ""
-        if isinstance(v, list):         return len(v) > 0
-        return bool(v)
-
-    def _display(self, v):
-        if isinstance(v, float) and v == int(v): return str(int(v))
-        if isinstance(v, list): return "[" + ", ".join(self._display(x) for x in v) + "]"
-        return str(v)
-
-    def _coerce_int(self, v):
-        try: return int(float(str(v)))
-        except: return 0
-
-    def _coerce_float(self, v):
-        try: return float(str(v))
-        except: return 0.0
+        return Num(0)
+
+    def _id_tail(self, name):
+        """What follows an identifier: a call, an index or a plain variable."""
+        if self.match('LPAREN'):
+            self.eat(); return self._call(name)
+        if self.match('LBRACK'):
+            self.eat(); idx = self.expression(); self.eat('RBRACK')
+            return Index(name, idx)
+        return Var(name)
+
+    def _call(self, name):
+        if name in ('read_file', 'mem_read'):
+            args = [Str(self.eat('STRING')[1])]
+        elif name in ('write_file', 'mem_write'):
+            args = [Str(self.eat('STRING')[1])]; self.eat('COMMA')
+            args.append(self.expression())
+        elif name in ('ask', 'input'):
+            args = [] if self.match('RPAREN') else [self.expression()]
+        elif name in _ONE_ARG:
+            args = [self.expression()]
+        elif name in _TWO_ARG:
+            a = self.expression(); self.eat('COMMA')
+            args = [a, self.expression()]
+        elif name in _NO_ARG:
+            args = []
+        elif name == 'rand':
+            # range form rand(lo - hi): exactly INT/FLOAT, OP(-), INT/FLOAT
+            toks = self._collect_until('RPAREN')
+            if (len(toks) == 3 and
+                toks[0][0] in ('INT', 'FLOAT') and
+                toks[1] == ('OP', '-') and
+                toks[2][0] in ('INT', 'FLOAT')):
+                lo, hi = int(toks[0][1]), int(toks[2][1])
+                if lo <= hi:
+                    self.eat('RPAREN')
+                    return RandRange(lo, hi)
+                # an empty range falls back to the pick-list form below
+            args = NovaParser(toks)._arg_list()
+        else:
+            args = self._arg_list()
+        self.eat('RPAREN')
+        return Call(name, args)
+
+    def _arg_list(self):
+        args = []
+        while not self.match('RPAREN') and self._cur:
+            start = self._pos
+            args.append(self.expression())
+            self._advanced(start)
+            if self.match('COMMA'): self.eat()
+        return args
+
+
+# --- built-ins ----------------------------------------------------------------
+# Called from the generated code.  Built-ins that write to the program's
+# output (put, ask, mem_write) are NovaInterpreter methods instead.
+
+def _truthy(v):
+    if isinstance(v, (int, float)): return v != 0
+    if isinstance(v, str):          return v != ""
+    if isinstance(v, list):         return len(v) > 0
+    return bool(v)
+
+def _coerce_int(v):
+    try: return int(float(str(v)))
+    except: return 0
+
+def _coerce_float(v):
+    try: return float(str(v))
+    except: return 0.0
+
+def _neg(v):
+    return -v if isinstance(v, (int, float)) else v
+
+def _index(arr, idx):
+    if isinstance(arr, list):
+        i = _coerce_int(idx)
+        return arr[i] if 0 <= i < len(arr) else ""
+    return ""
+
+class _Unset(int):
+    """Value of a variable slot that was never assigned.  It is a 0 for
+    every operation, but NAME[i] = v can still tell it apart from an
+    explicit 0 and start a new array."""
+
+_UNSET = _Unset(0)
+
+def _plain(v):
+    return 0 if v is _UNSET else v
+
+def _index_set(arr, idx, val):
+    if arr is _UNSET: arr = []
+    if isinstance(arr, list):
+        i = _coerce_int(idx)
+        while len(arr) <= i: arr.append("")
+        arr[i] = val
+    return arr
+
+def _b_read_file(path):
+    try:
+        with open(path, encoding='utf-8') as f: return f.read()
+    except Exception as e: return f"ERROR:{e}"
+
+def _b_write_file(path, v):
+    with open(path, 'w', encoding='utf-8') as f: f.write(str(v))
+    return v
+
+def _b_len(v):
+    return len(v) if isinstance(v, (str, list)) else 0
+
+def _b_abs(v):
+    return abs(v) if isinstance(v, (int, float)) else v
+
+def _b_type(v):
+    if isinstance(v, list):  return "array"
+    if isinstance(v, float): return "float"
+    if isinstance(v, int):   return "int"
+    return "string"
+
+def _b_rand(*choices):
+    # pick-list form: rand(a, b, c, ...); rand(lo - hi) compiles to randint
+    return _rng.choice(choices) if choices else 0
+
+def _b_cpu():
+    try:
+        import psutil
+        return 'CPU: {:.1f}%'.format(psutil.cpu_percent(interval=0.1))
+    except ImportError:
+        return 'CPU: N/A (pip install psutil)'
+
+def _b_ram():
+    try:
+        import psutil
+        m = psutil.virtual_memory()
+        used  = m.used  / 1073741824
+        total = m.total / 1073741824
+        return 'RAM: {:.1f} GB / {:.1f} GB ({:.0f}%)'.format(used, total, m.percent)
+    except ImportError:
+        return 'RAM: N/A (pip install psutil)'
+
+def _nvidia_smi_util():
+    import subprocess
+    out = subprocess.check_output(
+        ['nvidia-smi', '--query-gpu=utilization.gpu',
+         '--format=csv,noheader,nounits'],
+        stderr=subprocess.DEVNULL).decode().strip()
+    return out.split('\n')[0].strip()
+
+def _b_gpu():
+    try: return 'GPU: {}%'.format(_nvidia_smi_util())
+    except Exception: return 'GPU: N/A'
+
+def _b_gpu_val():
+    try: return float(_nvidia_smi_util())
+    except Exception: return -1.0
+
+def _b_cpu_val():
+    try:
+        import psutil
+        return float(psutil.cpu_percent(interval=0.1))
+    except ImportError:
+        return -1.0
+
+def _b_ram_used():
+    try:
+        import psutil
+        return psutil.virtual_memory().used / 1073741824
+    except ImportError:
+        return -1.0
+
+def _b_ram_total():
+    try:
+        import psutil
+        return psutil.virtual_memory().total / 1073741824
+    except ImportError:
+        return -1.0
+
+def _b_all_pc():
+    try:
+        import psutil
+        c = psutil.cpu_percent(interval=0.1)
+        m = psutil.virtual_memory()
+        used  = m.used  / 1073741824
+        total = m.total / 1073741824
+        cpu_s = 'CPU: {:.1f}%'.format(c)
+        ram_s = 'RAM: {:.1f}/{:.1f} GB'.format(used, total)
+        return '{} | {} | GPU: N/A'.format(cpu_s, ram_s)
+    except ImportError:
+        return 'N/A (pip install psutil)'
+
+def _b_unknown(*args):
+    return 0
+
+def _fail(msg):
+    raise SyntaxError(msg)
+
+_BUILTINS = {
+    'read_file': _b_read_file, 'write_file': _b_write_file, 'mem_read': _mem_read,
+    'len': _b_len, 'int': _coerce_int, 'float': _coerce_float, 'str': _display,
+    'abs': _b_abs, 'max': max, 'min': min, 'type': _b_type, 'rand': _b_rand,
+    'cpu': _b_cpu, 'ram': _b_ram, 'gpu': _b_gpu, 'gpu_val': _b_gpu_val,
+    'cpu_val': _b_cpu_val, 'ram_used': _b_ram_used, 'ram_total': _b_ram_total,
+    'all_pc': _b_all_pc,
+}
+_IO_BUILTINS = {'put': 'put', 'ask': 'ask', 'input': 'ask', 'mem_write': 'mem_write'}
+
+
+# --- code generator -----------------------------------------------------------
+# The syntax tree is translated to Python source once and handed to
+# compile(), so loop bodies run as CPython bytecode rather than being
+# re-dispatched node by node.  Every variable name in the program gets a
+# slot in the list S, fixed at compile time and listed in _SLOT_NAMES; the
+# other names the generated code uses are passed in by NovaInterpreter.run_all.
+
+_CMP_OPS = {'==', '!=', '<', '>', '<=', '>='}
+
+# CPython refuses more than 20 nested loop blocks in one function and about
+# 200 nested parentheses in one expression.  Statements nested deeper than
+# _MAX_DEPTH move into a function of their own, and operator chains longer
+# than _FLAT_CHAIN are emitted flat through a temporary.
+_MAX_DEPTH  = 16
+_FLAT_CHAIN = 32
+
+class _PyGen:
+    def __init__(self):
+        self.out   = []
+        self.loops = 0          # break outside a loop raises BreakSignal
+        self.depth = 0          # blocks open in the function being emitted
+        self.slots = {}         # variable name -> index into S
+        self.funcs = []         # split-off deep statements, see split()
+        self.tmps  = 0
+
+    def generate(self, stmts):
+        # The program becomes the body of one function whose parameters are
+        # the runtime names, so inside loops S, _truthy, _op_add & co. are
+        # fast locals instead of globals-dict lookups.
+        self.block(stmts, 1)
+        head = [f"_SLOT_NAMES = {tuple(self.slots)!r}",
+                f"def _nova_main(*, {', '.join(_ENV_NAMES)}):"]
+        return '\n'.join(head + self.out + self.funcs) + '\n'
+
+    def slot(self, name):
+        i = self.slots.get(name)
+        if i is None: i = self.slots[name] = len(self.slots)
+        return i
+
+    def emit(self, ind, line):
+        self.out.append('    ' * ind + line)
+
+    def block(self, stmts, ind):
+        n = len(self.out)
+        self.depth += 1
+        for s in stmts:
+            if self.depth >= _MAX_DEPTH and type(s) in (If, While, Repeat):
+                self.split(s, ind)
+            else:
+                self._STMT[type(s)](self, s, ind)
+        self.depth -= 1
+        if len(self.out) == n: self.emit(ind, 'pass')
+
+    def split(self, s, ind):
+        # Emit s as its own top-level function, called with the same
+        # runtime names.  A break inside it that belongs to a loop out
+        # here arrives as BreakSignal.
+        k = len(self.funcs); self.funcs.append(None)    # nested splits come after
+        name  = f"_nova_b{k}"
+        saved = self.out, self.loops, self.depth
+        self.out, self.loops, self.depth = [f"def {name}(*, {', '.join(_ENV_NAMES)}):"], 0, 1
+        self._STMT[type(s)](self, s, 1)
+        self.funcs[k] = '\n'.join(self.out)
+        self.out, self.loops, self.depth = saved
+        if not self.loops:
+            self.emit(ind, f"{name}(**_env)"); return
+        self.emit(ind, "try:")
+        self.emit(ind + 1, f"{name}(**_env)")
+        self.emit(ind, "except _BreakSignal:")
+        self.emit(ind + 1, "break")
+
+    # -- statements ------------------------------------------------------------
+
+    def s_assign(self, s, ind):
+        self.emit(ind, f"S[{self.slot(s.name)}] = {self.value(s.expr)}")
+
+    def s_index_assign(self, s, ind):
+        i = self.slot(s.name)
+        self.emit(ind, f"S[{i}] = _index_set(S[{i}], {self.expr(s.index)}, {self.value(s.expr)})")
+
+    def s_print(self, s, ind):
+        self.emit(ind, f"_out(_display({self.expr(s.expr)}))")
+
+    def s_expr(self, s, ind):
+        self.emit(ind, self.expr(s.expr))
+
+    def s_if(self, s, ind):
+        kw = 'if'
+        for cond, body in s.branches:
+            self.emit(ind, f"{kw} _truthy({self.expr(cond)}):")
+            self.block(body, ind + 1); kw = 'elif'
+        if s.else_ is not None:
+            self.emit(ind, "else:")
+            self.block(s.else_, ind + 1)
+
+    def s_while(self, s, ind):
+        self.emit(ind, f"while _truthy({self.expr(s.cond)}):")
+        self.loops += 1; self.block(s.body, ind + 1); self.loops -= 1
+        self.emit(ind + 1, f"_sleep({s.delay_ms / 1000.0!r})")
+
+    def s_repeat(self, s, ind):
+        self.emit(ind, f"for _ in range(_coerce_int({self.expr(s.count)})):")
+        self.loops += 1; self.block(s.body, ind + 1); self.loops -= 1
+
+    def s_break(self, s, ind):
+        self.emit(ind, "break" if self.loops else "raise _BreakSignal()")
+
+    def s_pause(self, s, ind):
+        if s.ms is None: self.emit(ind, "input()")      # wait for Enter
+        else:            self.emit(ind, f"_sleep(float({self.expr(s.ms)}) / 1000.0)")
+
+    def s_write_file(self, s, ind):
+        self.emit(ind, f"_call_write_file({s.path!r}, {self.expr(s.expr)})")
+
+    def s_mem_write(self, s, ind):
+        self.emit(ind, f"_call_mem_write({s.seg!r}, {self.expr(s.expr)})")
+
+    def s_label(self, s, ind):
+        if s.value is None:
+            self.emit(ind, self.expr(s.name)); return
+        args = ', '.join(self.expr(e) for e in [s.name, s.value] + s.extra)
+        self.emit(ind, f"_label({args})")
+
+    def s_txtbox(self, s, ind):
+        varname = 'None' if s.varname is None else self.expr(s.varname)
+        args = ', '.join([self.expr(s.label), varname] + [self.expr(e) for e in s.extra])
+        self.emit(ind, f"_txtbox({args})")
+        self.block(s.body, ind)
+
+    def s_colors(self, s, ind):
+        if s.preset is not None:
+            self.emit(ind, f"_colors({self.expr(s.preset)})")
+        for key, e in s.assigns:
+            self.emit(ind, f"S[{self.slot('_theme_' + key)}] = _display({self.expr(e)})")
+
+    # -- expressions -----------------------------------------------------------
+
+    def expr(self, e):
+        return self._EXPR[type(e)](self, e)
+
+    def value(self, e):
+        # An expression whose result gets stored.  Only a variable read (or
+        # a builtin handing an argument back) can yield _UNSET; it is stored
+        # as a plain 0 so the sentinel never leaves its own slot.
+        if type(e) is Var:
+            v = self.e_var(e)
+            return f"(0 if {v} is _UNSET else {v})"
+        if type(e) is Call:
+            return f"_plain({self.e_call(e)})"
+        return self.expr(e)
+
+    def e_const(self, e):
+        return repr(e.val)
+
+    def e_var(self, e):
+        return f"S[{self.slot(e.name)}]"
+
+    def e_index(self, e):
+        return f"_index(S[{self.slot(e.name)}], {self.expr(e.index)})"
+
+    def e_array(self, e):
+        return '[' + ', '.join(self.value(x) for x in e.items) + ']'
+
+    def e_neg(self, e):
+        return f"_neg({self.expr(e.operand)})"
+
+    def e_binop(self, e):
+        # Operators are left-associative, so a chain like 1 + 2 + 3 is a
+        # left spine of BinOps; walk it with a loop rather than recursion.
+        spine = []
+        while type(e) is BinOp:
+            spine.append(e); e = e.left
+        spine.reverse()
+        acc = self.expr(e)
+        if len(spine) <= _FLAT_CHAIN:
+            for b in spine: acc = self.binop(b.op, acc, self.expr(b.right))
+            return acc
+        t = f"_t{self.tmps}"; self.tmps += 1
+        steps = [f"({t} := {acc})"]
+        steps += [f"({t} := {self.binop(b.op, t, self.expr(b.right))})" for b in spine]
+        return f"({', '.join(steps)})[-1]"
+
+    @staticmethod
+    def binop(op, l, r):
+        if op in _CMP_OPS:   return f"(1 if {l} {op} {r} else 0)"
+        if op in ('-', '*'): return f"({l} {op} {r})"
+        fn = {'+': '_op_add', '/': '_op_div', '%': '_op_mod'}[op]
+        return f"{fn}({l}, {r})"
+
+    def e_call(self, e):
+        name = _IO_BUILTINS.get(e.name) or (e.name if e.name in _BUILTINS else 'unknown')
+        return f"_call_{name}({', '.join(self.expr(a) for a in e.args)})"
+
+    def e_rand_range(self, e):
+        return f"_rng.randint({e.lo!r}, {e.hi!r})"
+
+    def e_fail(self, e):
+        return f"_fail({e.msg!r})"
+
+    def s_fail(self, s, ind):
+        self.emit(ind, self.e_fail(s))
+
+    _STMT = {
+        Let: s_assign,         Assign: s_assign,
+        IndexAssign: s_index_assign,
+        Print: s_print,        ExprStmt: s_expr,
+        If: s_if,              While: s_while,
+        Repeat: s_repeat,      Break: s_break,
+        Pause: s_pause,        WriteFile: s_write_file,
+        MemWrite: s_mem_write,
+        Label: s_label,        TxtBox: s_txtbox,
+        Colors: s_colors,      Fail: s_fail,
+    }
+    _EXPR = {
+        Num: e_const,          Str: e_const,
+        Var: e_var,            Index: e_index,
+        ArrayLit: e_array,     Neg: e_neg,
+        BinOp: e_binop,        Call: e_call,
+        RandRange: e_rand_range, Fail: e_fail,
+    }
+
+
+_CODE_CACHE     = collections.OrderedDict()   # sha1 of source -> code object
+_CODE_CACHE_MAX = 32
+
+def compile_tokens(tokens):
+    """Parse a token list and compile it to a Python code object."""
+    try:
+        src = _PyGen().generate(NovaParser(tokens).parse())
+        return compile(src, '<nova>', 'exec')
+    except (SyntaxError, RecursionError, MemoryError):
+        # Nova syntax errors are raised at run time (see Fail), so anything
+        # here is CPython's own nesting limits.
+        raise SyntaxError("Program is nested too deeply") from None
+
+def compile_nova(source):
+    """Compile Nova source to a Python code object, memoized per source hash."""
+    key  = hashlib.sha1(source.encode('utf-8')).digest()
+    code = _CODE_CACHE.get(key)
+    if code is not None:
+        _CODE_CACHE.move_to_end(key)
+        return code
+    code = _CODE_CACHE[key] = compile_tokens(tokenize(_inject_braces(preprocess(source))))
+    if len(_CODE_CACHE) > _CODE_CACHE_MAX: _CODE_CACHE.popitem(last=False)
+    return code
+
+
+# --- interpreter --------------------------------------------------------------
+
+class BreakSignal(Exception): pass
+
+_RUNTIME = {
+    '_display': _display, '_truthy': _truthy, '_coerce_int': _coerce_int,
+    '_neg': _neg, '_op_add': _op_add, '_op_div': _op_div, '_op_mod': _op_mod,
+    '_index': _index, '_index_set': _index_set, '_UNSET': _UNSET, '_plain': _plain,
+    '_sleep': time.sleep, '_rng': _rng, '_BreakSignal': BreakSignal,
+    '_call_unknown': _b_unknown, '_fail': _fail,
+}
+_RUNTIME.update(('_call_' + k, f) for k, f in _BUILTINS.items())
+_ENV_NAMES = tuple(_RUNTIME) + ('S', '_out', '_call_put', '_call_ask', '_call_mem_write',
+                                '_label', '_txtbox', '_colors', '_env')
+
+class NovaInterpreter:
+    def __init__(self, tokens, output_fn=None, ask_fn=None, code=None):
+        self.tokens = tokens
+        self.code   = code
+        self.vars   = {}
+        self._out   = output_fn or (lambda s: print(s))
+        self._ask   = ask_fn    or (lambda p: input(p))
+
+    def run_all(self):
+        if self.code is None:
+            self.code = compile_tokens(self.tokens)
+        ns = {}
+        exec(self.code, ns)             # defines _SLOT_NAMES and _nova_main
+        names = ns['_SLOT_NAMES']
+        # Slots start from self.vars (the REPL carries variables between
+        # runs) and are written back to it when the program ends.  Names
+        # set at runtime by txtbox/label go through _set_var.
+        S = self._slots = [self.vars.get(n, _UNSET) for n in names]
+        self._slot_of = {n: i for i, n in enumerate(names)}
+        env = dict(_RUNTIME)
+        env.update(S=S, _out=self._out,
+                   _call_put=self._put, _call_ask=self._ask_prompt,
+                   _call_mem_write=self._mem_write,
+                   _label=self._label, _txtbox=self._txtbox, _colors=self._colors)
+        env['_env'] = env               # for calls into split-off blocks
+        try:
+            ns['_nova_main'](**env)
+        finally:
+            for n, v in zip(names, S):
+                if v is not _UNSET: self.vars[n] = v
+
+    def _set_var(self, name, val):
+        i = self._slot_of.get(name)
+        if i is None: self.vars[name] = val
+        else:         self._slots[i] = val
+
+    # -- built-ins with output -------------------------------------------------
+
+    def _put(self, v):
+        self._out(_display(v)); return v
+
+    def _ask_prompt(self, *prompt):
+        return self._ask(_display(prompt[0]) if prompt else '')
+
+    def _mem_write(self, seg, v):
+        try: _mem_write(seg, _display(v))
+        except Exception as e: self._out(f"[mem_write error] {e}")
+        return v
+
+    def _label(self, name, value, *extra):
+        val = _display(value)
+        self._set_var(f"_label_{name}", val)
+        self._out(f"[{name}] {val}")
+
+    def _txtbox(self, lbl, varname, *extra):
+        lbl = _display(lbl)
+        if varname is not None: varname = _display(varname)
+        if lbl:
+            print(lbl)
+        if varname:
+            self._set_var(varname, self._ask(lbl + ": " if lbl else ""))
+
+    def _colors(self, preset):
+        preset = _display(preset)
+        if preset:
+            self._out(f"[theme: {preset}]")
 
 
 # --- public runner ------------------------------------------------------------
 
 def run_nova(source, output_fn=None, ask_fn=None):
-    expanded = preprocess(source)
-    braced   = _inject_braces(expanded)
-    tokens   = tokenize(braced)
-    interp   = NovaInterpreter(tokens, output_fn, ask_fn)
+    interp = NovaInterpreter(None, output_fn, ask_fn, code=compile_nova(source))
     interp.run_all()
     return interp
 
@@ -789,8 +1278,7 @@ def _repl():
             if line.strip() == "" and buf:
                 code = "\n".join(buf); buf = []
                 try:
-                    tokens = tokenize(_inject_braces(preprocess(code)))
-                    interp = NovaInterpreter(tokens)
+                    interp = NovaInterpreter(None, code=compile_nova(code))
                     interp.vars = vars_
                     interp.run_all()
                     vars_ = interp.vars
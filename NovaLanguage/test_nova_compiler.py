@@ -0,0 +1,36 @@
+import pathlib
+import unittest
+
+from nova_compiler import translate_nova_to_il
+
+HERE    = pathlib.Path(__file__).resolve().parent
+SAMPLES = HERE.parent / "samples"
+# IL for each sample as the original line-by-line translator produced it.
+EXPECTED = HERE / "testdata"
+
+
+def _il(src, name):
+    emitter, read_paths = translate_nova_to_il(src, name)
+    return emitter.get_il(emitter._main_lines), read_paths
+
+
+class SampleILTests(unittest.TestCase):
+
+    def test_samples_translate_to_known_il(self):
+        samples = sorted(SAMPLES.glob("*.nova"))
+        self.assertTrue(samples)
+        for path in samples:
+            with self.subTest(sample=path.name):
+                il, read_paths = _il(path.read_text(encoding="utf-8"), path.stem)
+                expected = (EXPECTED / (path.stem + ".il")).read_text(encoding="utf-8")
+                self.assertEqual(il, expected)
+                self.assertEqual(read_paths, set())
+
+    def test_read_file_paths_are_collected(self):
+        il, read_paths = _il('x = read_file("data/a.txt")\nput(x)', "P")
+        self.assertEqual(read_paths, {"data/a.txt"})
+        self.assertIn('ldstr "data/a.txt"', il)
+
+
+if __name__ == '__main__':
+    unittest.main()
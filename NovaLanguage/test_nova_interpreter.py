@@ -0,0 +1,159 @@
+import unittest
+
+from nova_interpreter import (NovaInterpreter, NovaParser, run_nova, tokenize,
+                              _inject_braces, preprocess, _PyGen, _ENV_NAMES)
+from nova_interpreter import (ArrayLit, Assign, BinOp, Break, Call, Fail, If, Index,
+                              Let, Neg, Num, Print, Repeat, Str, Var)
+
+
+def _run(src):
+    out = []
+    run_nova(src, output_fn=out.append)
+    return out
+
+
+def _run_until_error(src):
+    out = []
+    try:
+        run_nova(src, output_fn=out.append)
+    except SyntaxError as e:
+        out.append(f"SyntaxError: {e}")
+    return out
+
+
+def _parse(src):
+    return NovaParser(tokenize(_inject_braces(preprocess(src)))).parse()
+
+
+class TokenizeTests(unittest.TestCase):
+
+    def test_kinds_and_values(self):
+        self.assertEqual(
+            tokenize('have x = 3.5\nput("a b") x[1] == 2 <= y != z >= w; { } , % / * - +'),
+            [('ID', 'have'), ('ID', 'x'), ('EQ', '='), ('FLOAT', 3.5),
+             ('ID', 'put'), ('LPAREN', '('), ('STRING', 'a b'), ('RPAREN', ')'),
+             ('ID', 'x'), ('LBRACK', '['), ('INT', 1), ('RBRACK', ']'),
+             ('OP', '=='), ('INT', 2), ('OP', '<='), ('ID', 'y'), ('OP', '!='),
+             ('ID', 'z'), ('OP', '>='), ('ID', 'w'), ('SEMI', ';'),
+             ('LBRACE', '{'), ('RBRACE', '}'), ('COMMA', ','),
+             ('OP', '%'), ('OP', '/'), ('OP', '*'), ('OP', '-'), ('OP', '+')])
+
+    def test_line_comment_is_skipped(self):
+        # The old regex lexer produced OP '/' OP '/' ID 'c' here; preprocess()
+        # strips comments first, so programs never saw the difference.
+        self.assertEqual(tokenize('x = 1 // c'),
+                         [('ID', 'x'), ('EQ', '='), ('INT', 1)])
+        self.assertEqual(tokenize('a / b'), [('ID', 'a'), ('OP', '/'), ('ID', 'b')])
+
+    def test_comment_markers_inside_strings_are_kept(self):
+        self.assertEqual(tokenize('put("a//b")'),
+                         [('ID', 'put'), ('LPAREN', '('), ('STRING', 'a//b'), ('RPAREN', ')')])
+        self.assertEqual(preprocess('x = 1 // hi\nput("//")'), 'x = 1\nput("//")')
+
+    def test_malformed_input_matches_the_old_lexer(self):
+        self.assertEqual(tokenize('@ 12abc'), [('INT', 12), ('ID', 'abc')])
+        self.assertEqual(tokenize('x = -2.0e'),
+                         [('ID', 'x'), ('EQ', '='), ('OP', '-'), ('FLOAT', 2.0), ('ID', 'e')])
+        self.assertEqual(tokenize('"unterminated'), [('ID', 'unterminated')])
+
+
+class ParserTests(unittest.TestCase):
+
+    def test_syntax_tree(self):
+        self.assertEqual(
+            _parse('have a = [1, "x"]\n'
+                   'when(a[0] == 1) { put(a[1]) } otherwise { b = -2 * 3 + 1 }\n'
+                   'repeat 2 { break }'),
+            [Let('a', ArrayLit([Num(1), Str('x')])),
+             If([(BinOp('==', Index('a', Num(0)), Num(1)), [Print(Index('a', Num(1)))])],
+                [Assign('b', BinOp('+', BinOp('*', Neg(Num(2)), Num(3)), Num(1)))]),
+             Repeat(Num(2), [Break()])])
+
+    def test_bad_statement_becomes_fail_and_ends_the_list(self):
+        stmts = _parse('put(1)\narr[a] < 3\nput(2)')
+        self.assertEqual(stmts[0], Print(Num(1)))
+        self.assertIsInstance(stmts[1], Fail)
+        self.assertEqual(len(stmts), 2)
+
+    def test_progress_check_uses_positions_not_token_identity(self):
+        # Callers may hand in token lists that reuse one tuple object.
+        x = ('ID', 'x')
+        toks = [('ID', 'put'), ('LPAREN', '('), ('ID', 'foo'), ('LPAREN', '('),
+                x, x, ('RPAREN', ')'), ('RPAREN', ')')]
+        self.assertEqual(NovaParser(toks).parse(),
+                         [Print(Call('foo', [Var('x'), Var('x')]))])
+
+
+class LazySyntaxErrorTests(unittest.TestCase):
+    # A statement is only rejected when the program reaches it, as it was
+    # when statements were parsed while they ran.
+
+    def test_error_in_branch_not_taken(self):
+        self.assertEqual(_run('put("a")\nwhen(0 == 1) {\n  arr[a] < 3\n}\nput("b")'),
+                         ['a', 'b'])
+
+    def test_error_in_branch_taken(self):
+        self.assertEqual(
+            _run_until_error('put("a")\nwhen(1 == 1) {\n  put("in")\n  arr[a] < 3\n  put("no")\n}\nput("b")'),
+            ['a', 'in', "SyntaxError: Expected EQ, got OP ('<')"])
+
+    def test_statements_before_the_error_run(self):
+        self.assertEqual(_run_until_error('put("a")\nwhile(x < 3) { put(1) }\nput("b")')[0], 'a')
+
+
+class CodegenTests(unittest.TestCase):
+
+    def test_generated_source(self):
+        src = _PyGen().generate(_parse('have n = 0\nrepeat 3 { n = n + 1 }\nput(n - 1 < 2)'))
+        self.assertEqual(src.replace(', '.join(_ENV_NAMES), '...'), (
+            "_SLOT_NAMES = ('n',)\n"
+            "def _nova_main(*, ...):\n"
+            "    S[0] = 0\n"
+            "    for _ in range(_coerce_int(3)):\n"
+            "        S[0] = _op_add(S[0], 1)\n"
+            "    _out(_display((1 if (S[0] - 1) < 2 else 0)))\n"))
+
+    def test_long_operator_chains(self):
+        self.assertEqual(_run('put(' + ' - '.join(['1'] * 250) + ')'), ['-248'])
+        self.assertEqual(_run('put(' + ' + '.join(['1'] * 600) + ')'), ['600'])
+        self.assertEqual(_run('put(' + ' + '.join(['1'] * 2000) + ')'), ['2000'])
+        self.assertEqual(_run('put(' + ' * '.join(['2'] * 40) + ' % 7 < 3)'), ['1'])
+
+    def test_deeply_nested_loops(self):
+        self.assertEqual(_run('n = 0\n' + 'repeat 1 { ' * 25 + 'n = n + 1 ' + '} ' * 25 + '\nput(n)'),
+                         ['1'])
+        self.assertEqual(_run('n = 0\ni = 0\n' + 'while(i < 1, 0) { ' * 25 + 'i = i + 1 n = n + 1 '
+                              + '} ' * 25 + '\nput(n)'), ['1'])
+        self.assertEqual(_run('n = 0\n' + 'when(1 == 1) { ' * 120 + 'n = 7 ' + '} ' * 120 + '\nput(n)'),
+                         ['7'])
+
+    def test_break_out_of_deeply_nested_block(self):
+        self.assertEqual(_run('n = 0\n' + 'repeat 3 { ' * 40 + 'n = n + 1 ' + 'break } ' * 40 + '\nput(n)'),
+                         ['1'])
+        self.assertEqual(_run('n = 0\nrepeat 3 { n = n + 1 ' + 'when(1 == 1) { ' * 30 + 'break '
+                              + '} ' * 30 + 'n = 99 }\nput(n)'), ['1'])
+
+    def test_nesting_past_python_limits_is_a_nova_error(self):
+        with self.assertRaisesRegex(SyntaxError, 'nested too deeply'):
+            run_nova('put(' + '(' * 300 + '1' + ')' * 300 + ')')
+
+
+class UnsetVariableTests(unittest.TestCase):
+    # A variable read before it is assigned is 0.  Copying it into another
+    # variable stores a real 0, not "never assigned".
+
+    def test_assign_from_unset_then_index_assign(self):
+        self.assertEqual(_run('have y = undefinedvar\ny[0] = 1\nput(y)'), ['0'])
+
+    def test_assign_from_unset_is_kept_in_vars(self):
+        src = 'have y = undefinedvar'
+        interp = NovaInterpreter(tokenize(_inject_braces(preprocess(src))))
+        interp.run_all()
+        self.assertEqual(interp.vars, {'y': 0})
+
+    def test_index_assign_on_unset_starts_array(self):
+        self.assertEqual(_run('b[1] = "q"\nput(b[1])'), ['q'])
+
+
+if __name__ == '__main__':
+    unittest.main()